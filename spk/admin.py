@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import Produk, Kriteria, NilaiProduk, Periode 
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Produk, Kriteria, NilaiProduk, Periode, UserProfile
+from .models import Produk, Kriteria, NilaiProduk, Periode, UserProfile, HasilRanking, VersiData, PeriodeKotor
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -60,3 +60,19 @@ class NilaiProdukAdmin(admin.ModelAdmin):
     list_filter = ['kriteria', 'produk', 'periode', 'created_by']
     search_fields = ['produk__nama']
     readonly_fields = ['created_by', 'created_at']
+
+@admin.register(HasilRanking)
+class HasilRankingAdmin(admin.ModelAdmin):
+    list_display = ['periode', 'rank', 'produk', 'nilai', 'versi', 'dihitung_pada']
+    list_filter = ['periode']
+    search_fields = ['produk__nama']
+    readonly_fields = ['periode', 'produk', 'nilai', 'rank', 'versi', 'dihitung_pada']
+
+@admin.register(VersiData)
+class VersiDataAdmin(admin.ModelAdmin):
+    list_display = ['kunci', 'versi', 'diperbarui']
+    search_fields = ['kunci']
+
+@admin.register(PeriodeKotor)
+class PeriodeKotorAdmin(admin.ModelAdmin):
+    list_display = ['periode', 'ditandai_pertama', 'ditandai_terakhir']
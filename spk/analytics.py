@@ -1,47 +1,60 @@
 import json
-from django.db.models import Avg, Sum, Count
-from .models import Produk, Kriteria, NilaiProduk, Periode
-from django.db import models
+import time
+import numpy as np
+from django.db.models import Avg, Sum, Count, Min, Max, StdDev, Q, FilteredRelation
+from .cache import kriteria_referensi, kriteria_id, produk_referensi, ambil_periode_aktif
+from .models import Kriteria, NilaiProduk, Periode
+from .ranking import ambil_riwayat_ranking, ambil_halaman_ranking
+from .utils import (
+    muat_matriks_keputusan, normalisasi_terbobot, solusi_ideal,
+    hitung_preferensi_topsis, ranking_dari_nilai,
+)
 
+# batas sel (sampel x produk) per blok di get_sensitivitas_bobot, ~8 MB per array float64
+BATAS_SEL_SENSITIVITAS = 1_000_000
 
 
-def get_sales_analytics(periode_count=4):
-    """Analytics data penjualan"""
+def get_sales_analytics(periode_count=4, top_n=5):
+    """
+    Analytics data penjualan (kriteria C1) untuk `periode_count` periode terakhir.
+    Top-N produk dipilih dari total penjualan di jendela periode itu saja,
+    dan semua data chart diambil dengan satu query group-by.
+    """
     periods = list(Periode.objects.all().order_by('-tanggal_mulai')[:periode_count])
     periods.reverse()
-
-    sales_kriteria = Kriteria.objects.get(kode='C1')
     
     analytics_data = {
         'labels': [p.nama for p in periods],
         'datasets': []
     }
+    if not periods:
+        return analytics_data
     
-    # tampilin 5 produk pling atas
-    top_products = Produk.objects.annotate(
-        total_penjualan=Sum(
-            'nilaiproduk__nilai',
-            filter=models.Q(nilaiproduk__kriteria__kode='C1')
-        )
-    ).order_by('-total_penjualan')[:5]
-
+    baris = list(
+        NilaiProduk.objects.filter(kriteria_id=kriteria_id('C1'), periode__in=periods)
+        .values('produk_id', 'produk__nama', 'periode_id')
+        .annotate(total=Sum('nilai'))
+        .values_list('produk_id', 'produk__nama', 'periode_id', 'total')
+    )
+    if not baris:
+        return analytics_data
     
-    for product in top_products:
-        product_data = []
-        for period in periods:
-            try:
-                nilai = NilaiProduk.objects.get(
-                    produk=product,
-                    kriteria=sales_kriteria,
-                    periode=period
-                ).nilai
-                product_data.append(nilai)
-            except NilaiProduk.DoesNotExist:
-                product_data.append(0)
-        
+    # pivot ke matriks produk x periode
+    produk_nama = {produk_id: nama for produk_id, nama, _, _ in baris}
+    produk_ids = sorted(produk_nama)
+    indeks_produk = {produk_id: i for i, produk_id in enumerate(produk_ids)}
+    indeks_periode = {p.id: j for j, p in enumerate(periods)}
+    penjualan = np.zeros((len(produk_ids), len(periods)))
+    for produk_id, _, periode_id, total in baris:
+        penjualan[indeks_produk[produk_id], indeks_periode[periode_id]] = total or 0
+    
+    # tampilin top-N produk pling atas di jendela periode ini
+    top = np.argsort(-penjualan.sum(axis=1), kind='stable')[:top_n]
+    
+    for i in top:
         analytics_data['datasets'].append({
-            'label': product.nama,
-            'data': product_data,
+            'label': produk_nama[produk_ids[i]],
+            'data': penjualan[i].tolist(),
             'borderColor': get_chart_color(len(analytics_data['datasets'])),
             'backgroundColor': get_chart_color(len(analytics_data['datasets']), 0.1),
         })
@@ -50,49 +63,91 @@ def get_sales_analytics(periode_count=4):
 
 def get_performance_comparison(periode_awal, periode_akhir):
     """Perbandingan performa antar periode"""
-    hasil_awal = periode_awal.get_ranking_data() if periode_awal else []
-    hasil_akhir = periode_akhir.get_ranking_data() if periode_akhir else []
+    if not periode_akhir:
+        return []
+    return bandingkan_periode(periode_awal, periode_akhir)['perubahan']
+
+def bandingkan_periode(periode_awal, periode_akhir, limit=5):
+    """
+    Bandingkan ranking dua periode sembarang dari riwayat HasilRanking.
+    Mengembalikan perubahan rank semua produk (urut perubahan terbesar)
+    plus `limit` produk yang paling naik dan paling turun.
+    """
+    riwayat = ambil_riwayat_ranking([periode_awal, periode_akhir])
+    ids = [p.id for p in riwayat['periode']]
     
-    comparison = []
+    def baris(periode):
+        if periode and periode.id in ids:
+            i = ids.index(periode.id)
+            return riwayat['rank'][i], riwayat['nilai'][i]
+        kosong = np.full(len(riwayat['produk_ids']), np.nan)
+        return kosong, kosong
     
-    for hasil in hasil_akhir:
-        produk_nama = hasil['produk']
-        rank_akhir = hasil['rank']
-        nilai_akhir = hasil['nilai']
-        
-        # Cari ranking di periode awal
-        rank_awal = None
-        nilai_awal = None
-        for h in hasil_awal:
-            if h['produk'] == produk_nama:
-                rank_awal = h['rank']
-                nilai_awal = h['nilai']
-                break
-        
-        # itung perubahan
-        perubahan_rank = rank_awal - rank_akhir if rank_awal else 0
-        status = "naik" if perubahan_rank > 0 else "turun" if perubahan_rank < 0 else "stabil"
-        
+    rank_awal, nilai_awal = baris(periode_awal)
+    rank_akhir, nilai_akhir = baris(periode_akhir)
+    
+    # hanya produk yang punya ranking di periode akhir, urut rank akhir
+    ada = ~np.isnan(rank_akhir)
+    urut = np.flatnonzero(ada)[np.argsort(rank_akhir[ada], kind='stable')]
+    perubahan = np.where(np.isnan(rank_awal), 0, rank_awal - rank_akhir)[urut].astype(int)
+    urut_perubahan = np.argsort(-np.abs(perubahan), kind='stable')
+    
+    comparison = []
+    for k in urut_perubahan:
+        i = urut[k]
         comparison.append({
-            'produk': produk_nama,
-            'rank_awal': rank_awal,
-            'rank_akhir': rank_akhir,
-            'nilai_awal': nilai_awal,
-            'nilai_akhir': nilai_akhir,
-            'perubahan_rank': perubahan_rank,
-            'status': status
+            'produk': riwayat['produk'][i],
+            'rank_awal': None if np.isnan(rank_awal[i]) else int(rank_awal[i]),
+            'rank_akhir': int(rank_akhir[i]),
+            'nilai_awal': None if np.isnan(nilai_awal[i]) else float(nilai_awal[i]),
+            'nilai_akhir': float(nilai_akhir[i]),
+            'perubahan_rank': int(perubahan[k]),
+            'status': "naik" if perubahan[k] > 0 else "turun" if perubahan[k] < 0 else "stabil",
         })
     
-    return sorted(comparison, key=lambda x: abs(x['perubahan_rank']), reverse=True)
+    naik = sorted((c for c in comparison if c['perubahan_rank'] > 0), key=lambda c: -c['perubahan_rank'])
+    turun = sorted((c for c in comparison if c['perubahan_rank'] < 0), key=lambda c: c['perubahan_rank'])
+    return {
+        'periode_awal': periode_awal.nama if periode_awal else None,
+        'periode_akhir': periode_akhir.nama if periode_akhir else None,
+        'perubahan': comparison,
+        'naik': naik[:limit],
+        'turun': turun[:limit],
+    }
+
+def get_rank_trajectories(periode_list, produk_limit=None):
+    """Lintasan rank & nilai tiap produk di sepanjang periode (urut tanggal)"""
+    riwayat = ambil_riwayat_ranking(periode_list)
+    rank, nilai = riwayat['rank'], riwayat['nilai']
+    
+    # urutkan produk dari rank terbaik di periode terakhir
+    urut = np.argsort(rank[-1], kind='stable') if len(rank) else np.arange(0)
+    if produk_limit:
+        urut = urut[:produk_limit]
+    
+    def ke_list(arr):
+        return [None if np.isnan(x) else x for x in arr.tolist()]
+    
+    return {
+        'labels': [p.nama for p in riwayat['periode']],
+        'produk': [
+            {
+                'produk': riwayat['produk'][j],
+                'rank': [None if r is None else int(r) for r in ke_list(rank[:, j])],
+                'nilai': ke_list(nilai[:, j]),
+            }
+            for j in urut
+        ],
+    }
 
 def get_top_performers(periode, limit=5):
-    hasil = periode.get_ranking_data() if periode else []
-    return sorted(hasil, key=lambda x: x['nilai'], reverse=True)[:limit]
+    hasil, _ = ambil_halaman_ranking(periode, limit)
+    return hasil
 
 
 def get_improvement_analysis():
     """Analisis improvement produk"""
-    periode_aktif = Periode.objects.filter(is_active=True).first()
+    periode_aktif = ambil_periode_aktif()
     periode_sebelumnya = periode_aktif.get_periode_sebelumnya() if periode_aktif else None
     
     if not periode_sebelumnya:
@@ -118,27 +173,162 @@ def get_chart_color(index, opacity=1):
     return colors[index % len(colors)]
 
 def get_kriteria_analysis(periode):
-    """Analisis pengaruh tiap kriteria terhadap ranking"""
+    """
+    Analisis pengaruh tiap kriteria terhadap ranking: statistik sebaran
+    nilai (satu query group-by) plus korelasi tiap kriteria dengan skor
+    preferensi TOPSIS dan porsi kontribusinya, dihitung dari matriks keputusan.
+    """
     if not periode:
         return {}
     
-    # itung hubungan antara nilai kriteria dan ranking akhir
+    # count/mean/min/max/std semua kriteria sekaligus; periode ikut di kondisi
+    # join supaya nilai dibaca dari index (periode, kriteria, produk, nilai)
+    kriteria_list = list(Kriteria.objects.order_by('kode').annotate(
+        nilai_periode=FilteredRelation('nilaiproduk', condition=Q(nilaiproduk__periode=periode)),
+    ).annotate(
+        total_data=Count('nilai_periode'),
+        rata_rata=Avg('nilai_periode__nilai'),
+        nilai_min=Min('nilai_periode__nilai'),
+        nilai_max=Max('nilai_periode__nilai'),
+        # STDDEV versi SQLite (fungsi Python) gagal kalau menerima NULL dari LEFT JOIN
+        std_dev=StdDev('nilai_periode__nilai', filter=Q(nilai_periode__nilai__isnull=False)),
+    ))
+    if not kriteria_list:
+        return {}
+    
+    korelasi, kontribusi = _pengaruh_kriteria(periode, kriteria_list)
+    
     analysis = {}
-    kriteria_list = Kriteria.objects.all()
-    
-    for kriteria in kriteria_list:
-        # Ambil semua nilai untuk kriteria ini di periode tertentu
-        nilai_data = NilaiProduk.objects.filter(
-            kriteria=kriteria,
-            periode=periode
-        ).select_related('produk')
-        
-        # buat analisis sederhana, kita hitung rata-rata nilai per produk
+    for j, kriteria in enumerate(kriteria_list):
         analysis[kriteria.nama] = {
             'bobot': kriteria.bobot,
             'sifat': kriteria.sifat,
-            'rata_rata': nilai_data.aggregate(Avg('nilai'))['nilai__avg'] or 0,
-            'total_data': nilai_data.count()
+            'rata_rata': kriteria.rata_rata or 0,
+            'min': kriteria.nilai_min or 0,
+            'max': kriteria.nilai_max or 0,
+            'std_dev': kriteria.std_dev or 0,
+            'korelasi': None if np.isnan(korelasi[j]) else float(korelasi[j]),
+            'kontribusi': float(kontribusi[j]),
+            'total_data': kriteria.total_data,
         }
     
-    return analysis
\ No newline at end of file
+    return analysis
+
+def _pengaruh_kriteria(periode, kriteria_list):
+    """
+    Korelasi Pearson tiap kolom kriteria dengan skor preferensi TOPSIS,
+    dan porsi (%) tiap kriteria dalam jarak ke solusi ideal negatif.
+    """
+    X, _, _ = muat_matriks_keputusan(periode.id, kriteria_ids=[k.id for k in kriteria_list])
+    kosong = np.full(len(kriteria_list), np.nan)
+    if len(X) < 2:
+        return kosong, np.zeros(len(kriteria_list))
+    
+    bobot = [k.bobot for k in kriteria_list]
+    benefit = [k.sifat == 'benefit' for k in kriteria_list]
+    V = normalisasi_terbobot(X, bobot)
+    _, A_minus = solusi_ideal(V, benefit)
+    skor = hitung_preferensi_topsis(X, bobot, benefit)
+    
+    Xc = X - X.mean(axis=0)
+    sc = skor - skor.mean()
+    penyebut = np.linalg.norm(Xc, axis=0) * np.linalg.norm(sc)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        korelasi = np.where(penyebut > 0, (Xc.T @ sc) / penyebut, np.nan)
+    
+    jarak = np.sum((V - A_minus)**2, axis=0)
+    total = jarak.sum()
+    kontribusi = jarak / total * 100 if total > 0 else np.zeros(len(kriteria_list))
+    return korelasi, kontribusi
+
+def get_sensitivitas_bobot(periode, n_sampel=1000, sebaran=0.2, seed=None, top_rank=10, produk_limit=20):
+    """
+    Analisis sensitivitas Monte Carlo terhadap bobot kriteria.
+    `n_sampel` vektor bobot diambil dengan mengalikan tiap bobot dengan
+    faktor acak uniform(1 - sebaran, 1 + sebaran), lalu semua sampel
+    dievaluasi per blok dengan numpy (loop Python hanya per blok sampel).
+
+    Karena solusi ideal TOPSIS per kolom = bobot x (max/min kolom ternormalisasi)
+    untuk bobot >= 0, kuadrat jarak ke solusi ideal untuk semua sampel cukup
+    dihitung dengan satu perkalian matriks (produk x kriteria) @ (kriteria x sampel).
+    """
+    if not periode:
+        return {}
+    
+    kriteria = kriteria_referensi()
+    X, produk_ids, _ = muat_matriks_keputusan(periode.id, kriteria_ids=kriteria['ids'])
+    if not X.size:
+        return {}
+    
+    bobot = kriteria['bobot']
+    benefit = kriteria['benefit']
+    mulai = time.perf_counter()
+    
+    # matriks ternormalisasi (tanpa bobot) dan solusi idealnya
+    R = normalisasi_terbobot(X, np.ones(len(bobot)))
+    R_plus, R_minus = solusi_ideal(R, benefit)
+    jarak_plus = (R - R_plus)**2
+    jarak_minus = (R - R_minus)**2
+    
+    def rank_sampel(W):
+        # (sampel x produk): D^2 = sum_j w_j^2 (r_ij - r*_j)^2, diurutkan
+        # stabil dalam float64 seperti ranking biasa (seri: urut produk)
+        W2 = (W**2).T
+        D_plus = np.sqrt(jarak_plus @ W2)
+        D_minus = np.sqrt(jarak_minus @ W2)
+        return ranking_dari_nilai((D_minus / (D_plus + D_minus + 1e-10)).T)
+    
+    # rank dasar lewat rumus yang sama, jadi sebaran=0 memberi rank yang persis sama
+    n_produk = len(produk_ids)
+    rank_dasar = rank_sampel(np.asarray(bobot, dtype=float)[None, :])[0]
+    pilih = np.argsort(rank_dasar, kind='stable')[:produk_limit]
+    k = min(top_rank, n_produk)
+    
+    # sampel diproses per blok supaya memori tetap ~BATAS_SEL_SENSITIVITAS
+    # sel per array, berapa pun n_sampel x n_produk; hanya hitungan rank top-k
+    # dan rank produk yang ditampilkan yang disimpan
+    rng = np.random.default_rng(seed)
+    hitungan = np.zeros(n_produk * k, dtype=np.int64)
+    rank_pilih = np.empty((n_sampel, len(pilih)), dtype=np.int32)
+    ukuran_blok = max(1, BATAS_SEL_SENSITIVITAS // n_produk)
+    for awal in range(0, n_sampel, ukuran_blok):
+        n_blok = min(ukuran_blok, n_sampel - awal)
+        faktor = rng.uniform(1 - sebaran, 1 + sebaran, size=(n_blok, len(bobot)))
+        rank = rank_sampel(np.maximum(bobot * faktor, 0))
+        
+        # peluang menempati rank 1..top_rank, lewat satu bincount
+        di_top = rank <= k
+        kolom = np.broadcast_to(np.arange(n_produk), rank.shape)[di_top]
+        hitungan += np.bincount(kolom * k + (rank[di_top] - 1), minlength=n_produk * k)
+        rank_pilih[awal:awal + n_blok] = rank[:, pilih]
+    prob_rank = hitungan.reshape(n_produk, k) / n_sampel
+    
+    # statistik lain hanya untuk produk yang ditampilkan
+    p5, p50, p95 = np.percentile(rank_pilih, [5, 50, 95], axis=0)
+    prob_tetap = (rank_pilih == rank_dasar[pilih]).mean(axis=0)
+    durasi = time.perf_counter() - mulai
+    
+    produk_nama = produk_referensi()['nama']
+    return {
+        'periode': periode.nama,
+        'n_sampel': n_sampel,
+        'sebaran': sebaran,
+        'durasi_ms': durasi * 1000,
+        'top_rank': k,
+        'produk': [
+            {
+                'produk': produk_nama.get(int(produk_ids[i]), ''),
+                'rank_dasar': int(rank_dasar[i]),
+                'rank_rata': float(rank_pilih[:, j].mean()),
+                'rank_min': int(rank_pilih[:, j].min()),
+                'rank_max': int(rank_pilih[:, j].max()),
+                'rank_p5': float(p5[j]),
+                'rank_median': float(p50[j]),
+                'rank_p95': float(p95[j]),
+                'prob_tetap': float(prob_tetap[j]),
+                'prob_top': float(prob_rank[i].sum()),
+                'prob_rank': prob_rank[i].tolist(),
+            }
+            for j, i in enumerate(pilih)
+        ],
+    }
@@ -0,0 +1,199 @@
+"""
+API JSON async untuk widget dashboard (jalan lewat ASGI, spk_maza/asgi.py).
+Query ringan memakai ORM async; perhitungan ranking/analytics (ORM + numpy)
+dijalankan di thread pool, dan widget yang saling lepas dihitung bersamaan.
+"""
+import asyncio
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.core.exceptions import BadRequest
+from django.db import close_old_connections
+from django.http import Http404, JsonResponse
+from .cache import mulai_memo_request, selesai_memo_request
+from .instrumentasi import catatan_aktif, mulai_catatan, selesai_catatan
+from .models import Produk, NilaiProduk, Periode
+from .ranking import ambil_halaman_ranking, segarkan_ranking
+from .views import _periode_dari_get
+from .analytics import (
+    get_sales_analytics,
+    get_top_performers,
+    get_improvement_analysis,
+    get_kriteria_analysis,
+)
+
+
+def json_role_required(allowed_roles=[]):
+    """Versi async dari role_required: balas JSON 401/403, bukan redirect"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'Login diperlukan'}, status=401)
+            # dipasang ProfilMiddleware (dari session, tanpa query)
+            user_profile = request.profile
+            if not user_profile:
+                return JsonResponse({'error': 'Profile user tidak ditemukan'}, status=403)
+            if user_profile.role not in allowed_roles and user_profile.role != 'admin':
+                return JsonResponse({'error': 'Anda tidak memiliki akses'}, status=403)
+            request.user_profile = user_profile
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _di_thread(fungsi):
+    """
+    Jalankan fungsi sync (ORM + numpy) di thread pool, bukan di thread
+    sync tunggal Django, supaya beberapa widget bisa jalan bersamaan.
+    Context request ikut tersalin ke thread, jadi tiap thread memasang memo
+    dan catatan waktunya sendiri (keduanya tidak thread-safe); catatannya
+    digabung ke catatan request setelah selesai. Koneksi DB milik thread
+    pool ditutup lagi setelah selesai.
+    """
+    def jalankan(*args, **kwargs):
+        induk = catatan_aktif()
+        token_memo = mulai_memo_request()
+        catatan, token_catatan = mulai_catatan()
+        try:
+            return fungsi(*args, **kwargs)
+        finally:
+            close_old_connections()
+            selesai_catatan(token_catatan)
+            selesai_memo_request(token_memo)
+            if induk is not None:
+                induk.gabung(catatan)
+    return sync_to_async(jalankan, thread_sensitive=False)
+
+
+async def _periode_dari_request(request):
+    """
+    Periode dari ?periode=<id> (default periode aktif terbaru), divalidasi
+    seperti view biasa. Hasilnya (periode, None), atau (None, JsonResponse
+    400/404) kalau id bukan angka / tidak ada.
+    """
+    try:
+        return await sync_to_async(_periode_dari_get)(request, 'periode', wajib=False), None
+    except BadRequest as e:
+        return None, JsonResponse({'error': str(e)}, status=400)
+    except Http404:
+        return None, JsonResponse({'error': 'Periode tidak ditemukan'}, status=404)
+
+
+def _limit(request, default, maksimum=100):
+    try:
+        return min(max(int(request.GET.get('limit', default)), 1), maksimum)
+    except (TypeError, ValueError):
+        return default
+
+
+async def widget_ranking(request, periode):
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+    hasil, _ = await _di_thread(ambil_halaman_ranking)(periode, _limit(request, 1000, maksimum=100000), offset)
+    return hasil.ke_list()
+
+
+async def widget_top_performers(request, periode):
+    hasil = await _di_thread(get_top_performers)(periode, limit=_limit(request, 5))
+    return hasil.ke_list()
+
+
+async def widget_improvements(request, periode):
+    return await _di_thread(get_improvement_analysis)()
+
+
+async def widget_kriteria(request, periode):
+    return await _di_thread(get_kriteria_analysis)(periode)
+
+
+async def widget_sales(request, periode):
+    return await _di_thread(get_sales_analytics)()
+
+
+async def widget_ringkasan(request, periode):
+    total_produk, total_nilai, nilai_user = await asyncio.gather(
+        Produk.objects.acount(),
+        NilaiProduk.objects.acount(),
+        NilaiProduk.objects.filter(created_by=await request.auser()).acount(),
+    )
+    return {
+        'total_produk': total_produk,
+        'total_nilai': total_nilai,
+        'nilai_user': nilai_user,
+    }
+
+
+# nama widget: (fungsi, hanya admin & staff)
+WIDGET = {
+    'ringkasan': (widget_ringkasan, False),
+    'ranking': (widget_ranking, False),
+    'top_performers': (widget_top_performers, True),
+    'improvements': (widget_improvements, True),
+    'kriteria': (widget_kriteria, True),
+    'sales': (widget_sales, True),
+}
+
+
+def _boleh(user_profile, hanya_staff):
+    return not hanya_staff or user_profile.is_staff_user()
+
+
+async def _siapkan_ranking(periode):
+    """
+    Segarkan ranking periode ini dan periode sebelumnya dulu, sebelum
+    widget jalan bersamaan, supaya ranking yang basi tidak dihitung
+    dan ditulis ulang oleh beberapa widget sekaligus.
+    """
+    if not periode:
+        return
+    sebelumnya = await Periode.objects.filter(
+        tanggal_mulai__lt=periode.tanggal_mulai
+    ).order_by('-tanggal_mulai').afirst()
+    await _di_thread(segarkan_ranking)([periode, sebelumnya])
+
+
+@json_role_required(['admin', 'staff', 'viewer'])
+async def api_widget(request, nama):
+    """JSON satu widget dashboard: /api/widget/<nama>/?periode=<id>"""
+    if nama not in WIDGET:
+        return JsonResponse({'error': f'Widget tidak dikenal: {nama}'}, status=404)
+    fungsi, hanya_staff = WIDGET[nama]
+    if not _boleh(request.user_profile, hanya_staff):
+        return JsonResponse({'error': 'Anda tidak memiliki akses'}, status=403)
+
+    periode, error = await _periode_dari_request(request)
+    if error:
+        return error
+    data = await fungsi(request, periode)
+    return JsonResponse({
+        'periode': periode.nama if periode else None,
+        nama: data,
+    })
+
+
+@json_role_required(['admin', 'staff', 'viewer'])
+async def api_dashboard(request):
+    """
+    JSON beberapa widget sekaligus, dihitung bersamaan:
+    /api/dashboard/?widget=ranking,top_performers&periode=<id>
+    (default: semua widget yang boleh dilihat user)
+    """
+    diminta = [w for w in request.GET.get('widget', '').split(',') if w] or list(WIDGET)
+    tidak_dikenal = [w for w in diminta if w not in WIDGET]
+    if tidak_dikenal:
+        return JsonResponse({'error': f'Widget tidak dikenal: {", ".join(tidak_dikenal)}'}, status=400)
+    diminta = [w for w in diminta if _boleh(request.user_profile, WIDGET[w][1])]
+
+    periode, error = await _periode_dari_request(request)
+    if error:
+        return error
+    if set(diminta) - {'ringkasan', 'sales'}:
+        await _siapkan_ranking(periode)
+
+    hasil = await asyncio.gather(*(WIDGET[w][0](request, periode) for w in diminta))
+    data = {'periode': periode.nama if periode else None}
+    data.update(zip(diminta, hasil))
+    return JsonResponse(data)
@@ -7,3 +7,6 @@ class SpkConfig(AppConfig):
 
     def ready(self):
         import spk.signals
+        from django.db.backends.signals import connection_created
+        from .instrumentasi import pasang_pencatat_query
+        connection_created.connect(pasang_pencatat_query)
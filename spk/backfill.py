@@ -0,0 +1,114 @@
+"""
+Hitung ulang ranking seluruh riwayat periode (`manage.py backfill_rankings`),
+misalnya setelah bobot kriteria diubah. Periode dibagi per chunk ke
+ProcessPoolExecutor; tiap worker memuat satu chunk dengan satu query dan
+menghitungnya dengan kernel batch (hitung_topsis_batch). Hasilnya ditulis
+proses utama per batch, jadi kalau terhenti, jalankan lagi: periode yang
+rankingnya sudah sesuai versi data dilewati.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import HasilRanking, VersiData, PeriodeKotor
+from .ranking import periode_basi
+from .utils import hitung_topsis_batch
+from .worker import siapkan_django
+
+
+def hitung_chunk(periode_ids):
+    """
+    Dijalankan di worker: versi dibaca sebelum data dimuat, jadi perubahan
+    di tengah perhitungan membuat hasil ini tetap dianggap basi.
+    Return (periode_ids, {periode_id: versi}, hasil hitung_topsis_batch).
+    """
+    versi = VersiData.versi_periode_banyak(periode_ids)
+    return periode_ids, versi, hitung_topsis_batch(periode_ids)
+
+
+def _tulis_batch(antrian):
+    """Ganti ranking tersimpan beberapa periode sekaligus dalam satu transaksi"""
+    dihitung_pada = timezone.now()
+    objek = []
+    selesai = Q(pk__in=[])
+    for periode_ids, versi, batch, dikirim in antrian:
+        selesai |= Q(periode_id__in=periode_ids, ditandai_terakhir__lte=dikirim)
+        if batch is None:
+            continue
+        produk_ids = batch['produk_ids'].tolist()
+        for i, periode_id in enumerate(batch['periode_ids'].tolist()):
+            objek.extend(
+                HasilRanking(
+                    periode_id=periode_id,
+                    produk_id=produk_id,
+                    nilai=nilai,
+                    rank=rank,
+                    versi=versi[periode_id],
+                    dihitung_pada=dihitung_pada,
+                )
+                for produk_id, nilai, rank in zip(
+                    produk_ids, batch['nilai'][i].tolist(), batch['rank'][i].tolist()
+                )
+            )
+    periode_ids = [pid for ids, _, _, _ in antrian for pid in ids]
+    with transaction.atomic():
+        HasilRanking.objects.filter(periode_id__in=periode_ids).delete()
+        HasilRanking.objects.bulk_create(objek, batch_size=1000)
+        # antrian worker yang tidak ditandai lagi sejak chunk dikirim ikut selesai
+        PeriodeKotor.objects.filter(selesai).delete()
+
+
+def backfill_ranking(periode_list, workers=1, ukuran_chunk=12, ukuran_tulis=48, paksa=False, progres=None):
+    """
+    Hitung ulang ranking periode_list. workers <= 1 menghitung di proses ini.
+    progres(selesai, total, detik) dipanggil tiap kali satu batch ditulis.
+    Return jumlah periode yang dihitung.
+    """
+    periode_list = [p for p in periode_list if p]
+    if not paksa:
+        periode_list = periode_basi(periode_list)
+    ids = [p.id for p in periode_list]
+    chunks = [ids[i:i + ukuran_chunk] for i in range(0, len(ids), ukuran_chunk)]
+
+    mulai = time.perf_counter()
+    selesai = 0
+    antrian = []
+
+    def terima(hasil, dikirim):
+        antrian.append((*hasil, dikirim))
+        if sum(len(a[0]) for a in antrian) >= ukuran_tulis:
+            tulis()
+
+    def tulis():
+        nonlocal selesai, antrian
+        if not antrian:
+            return
+        _tulis_batch(antrian)
+        selesai += sum(len(a[0]) for a in antrian)
+        antrian = []
+        if progres:
+            progres(selesai, len(ids), time.perf_counter() - mulai)
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            dikirim = timezone.now()
+            terima(hitung_chunk(chunk), dikirim)
+    else:
+        # spawn: worker tidak mewarisi koneksi DB proses ini, dan menyiapkan
+        # Django sendiri lewat spk.worker (modul ini baru bisa diimport
+        # setelah django.setup)
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=siapkan_django,
+            initargs=(settings.DATABASES,),
+        ) as pool:
+            dikirim = timezone.now()
+            futures = [pool.submit(hitung_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                terima(future.result(), dikirim)
+    tulis()
+    return len(ids)
@@ -0,0 +1,190 @@
+"""
+Generator data sintetis dan benchmark untuk jalur ranking & analytics.
+Dipakai oleh `manage.py benchmark_spk`; jalankan hanya di database test.
+"""
+import contextlib
+import datetime
+import io
+import json
+import statistics
+import time
+import tracemalloc
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from .models import Produk, Kriteria, NilaiProduk, Periode, UserProfile, VersiData
+from . import analytics
+from .ranking import ambil_ranking
+from .utils import hitung_topsis
+
+UKURAN_BATCH = 10000
+
+
+def buat_data_sintetis(n_produk=10000, n_kriteria=20, n_periode=60, isi=0.95, seed=0, log=None):
+    """
+    Isi database dengan data acak: n_kriteria kriteria (C1 penjualan, C3 rating,
+    sebagian cost), n_produk produk, n_periode periode bulanan, dan NilaiProduk
+    untuk kira-kira `isi` bagian dari semua sel produk x kriteria x periode.
+    """
+    rng = np.random.default_rng(seed)
+    
+    with transaction.atomic():
+        Kriteria.objects.bulk_create([
+            Kriteria(
+                kode=f'C{j + 1}',
+                nama=f'Kriteria {j + 1}',
+                bobot=float(rng.integers(1, 6)),
+                sifat='cost' if j % 4 == 3 else 'benefit',
+                bisa_diinput_user=j < 4,
+            )
+            for j in range(n_kriteria)
+        ])
+        Produk.objects.bulk_create(
+            [Produk(nama=f'Produk {i + 1}') for i in range(n_produk)], batch_size=UKURAN_BATCH
+        )
+        awal = datetime.date(2020, 1, 1)
+        Periode.objects.bulk_create([
+            Periode(
+                nama=f'Periode {t + 1}',
+                tanggal_mulai=awal + datetime.timedelta(days=30 * t),
+                tanggal_selesai=awal + datetime.timedelta(days=30 * t + 29),
+                is_active=(t == n_periode - 1),
+            )
+            for t in range(n_periode)
+        ])
+    
+    produk_ids = np.array(Produk.objects.order_by('id').values_list('id', flat=True))
+    kriteria_ids = np.array(Kriteria.objects.order_by('kode').values_list('id', flat=True))
+    periode_ids = list(Periode.objects.order_by('tanggal_mulai').values_list('id', flat=True))
+    
+    for t, periode_id in enumerate(periode_ids):
+        nilai = rng.uniform(1, 100, size=(len(produk_ids), len(kriteria_ids))).round(2)
+        i, j = np.nonzero(rng.random(nilai.shape) < isi)
+        objs = [
+            NilaiProduk(produk_id=p, kriteria_id=k, periode_id=periode_id, nilai=v)
+            for p, k, v in zip(produk_ids[i].tolist(), kriteria_ids[j].tolist(), nilai[i, j].tolist())
+        ]
+        NilaiProduk.objects.bulk_create(objs, batch_size=UKURAN_BATCH)
+        if log:
+            log(f'Periode {t + 1}/{len(periode_ids)}: {len(objs)} nilai')
+    
+    # bulk_create tidak memicu signal
+    for kunci in ['kriteria', 'produk'] + [VersiData.kunci_periode(pid) for pid in periode_ids]:
+        VersiData.naikkan(kunci)
+
+
+def ukur(fungsi, ulang=3):
+    """
+    Jalankan `fungsi` beberapa kali; catat waktu (median & min) dan jumlah query.
+    Memori puncak diukur di satu putaran tambahan, karena tracemalloc memperlambat eksekusi.
+    """
+    waktu, query = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(ulang):
+            with CaptureQueriesContext(connection) as q:
+                mulai = time.perf_counter()
+                fungsi()
+                waktu.append(time.perf_counter() - mulai)
+            query.append(len(q))
+        
+        tracemalloc.start()
+        try:
+            fungsi()
+            memori_puncak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    
+    return {
+        'waktu_median': statistics.median(waktu),
+        'waktu_min': min(waktu),
+        'query': max(query),
+        'memori_puncak': memori_puncak,
+    }
+
+
+def daftar_kasus():
+    """Semua jalur yang diukur: fungsi ranking, analytics, dan view lewat test client"""
+    periode = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+    sebelumnya = periode.get_periode_sebelumnya()
+    
+    # bukan get_or_create: signal profil ganda akan me-rollback atomic-nya
+    user = User.objects.filter(username='benchmark').first()
+    if user is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            user = User.objects.create_user('benchmark')
+    UserProfile.objects.update_or_create(user=user, defaults={'role': 'admin'})
+    client = Client()
+    client.force_login(user)
+    
+    def view(url):
+        def jalankan():
+            response = client.get(url)
+            # konsumsi isi streaming supaya biayanya ikut terukur
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            assert response.status_code == 200, f'{url}: {response.status_code}'
+        return jalankan
+    
+    return {
+        'hitung_topsis': lambda: hitung_topsis(periode.id),
+        'ambil_ranking': lambda: ambil_ranking(periode),
+        'get_sales_analytics': lambda: analytics.get_sales_analytics(),
+        'get_performance_comparison': lambda: analytics.get_performance_comparison(sebelumnya, periode),
+        'get_top_performers': lambda: analytics.get_top_performers(periode),
+        'get_improvement_analysis': lambda: analytics.get_improvement_analysis(),
+        'get_kriteria_analysis': lambda: analytics.get_kriteria_analysis(periode),
+        'view_user_home': view('/spk/home/'),
+        'view_hasil_topsis': view('/spk/hasil/'),
+        'view_analytics_dashboard': view('/spk/analytics/'),
+        'view_export_ranking': view('/spk/export/ranking/'),
+        'view_export_ranking_semua_csv': view('/spk/export/ranking_semua/?format=csv'),
+    }
+
+
+def jalankan_benchmark(ulang=3, log=None):
+    hasil = {}
+    for nama, fungsi in daftar_kasus().items():
+        hasil[nama] = ukur(fungsi, ulang)
+        if log:
+            log(_format_baris(nama, hasil[nama]))
+    return hasil
+
+
+def bandingkan_baseline(hasil, baseline, toleransi=0.25):
+    """
+    Daftar regresi terhadap baseline: waktu median lebih lambat dari
+    (1 + toleransi) x baseline, atau jumlah query bertambah.
+    """
+    regresi = []
+    for nama, data in hasil.items():
+        dasar = baseline.get(nama)
+        if not dasar:
+            continue
+        if data['waktu_median'] > dasar['waktu_median'] * (1 + toleransi):
+            regresi.append(
+                f"{nama}: waktu {data['waktu_median'] * 1000:.1f} ms "
+                f"(baseline {dasar['waktu_median'] * 1000:.1f} ms)"
+            )
+        if data['query'] > dasar['query']:
+            regresi.append(f"{nama}: query {data['query']} (baseline {dasar['query']})")
+    return regresi
+
+
+def baca_baseline(path):
+    with open(path) as f:
+        return json.load(f)['hasil']
+
+
+def simpan_baseline(path, hasil, ukuran):
+    with open(path, 'w') as f:
+        json.dump({'ukuran': ukuran, 'hasil': hasil}, f, indent=2)
+
+
+def _format_baris(nama, data):
+    return (
+        f"{nama:32s} {data['waktu_median'] * 1000:10.1f} ms "
+        f"{data['query']:6d} query {data['memori_puncak'] / 2**20:8.1f} MiB"
+    )
@@ -0,0 +1,224 @@
+import contextvars
+import threading
+import time
+import numpy as np
+from django.conf import settings
+
+# memo yang hanya hidup selama satu request (diisi oleh MemoRequestMiddleware)
+_memo_request = contextvars.ContextVar('spk_memo_request', default=None)
+
+
+class MemoRequest:
+    """Penyimpanan hasil perhitungan selama satu request, plus hitungan hit/miss"""
+
+    def __init__(self):
+        self.data = {}
+        self.hit = 0
+        self.miss = 0
+
+    def cari(self, kunci):
+        """Return (ada, nilai) dan catat sebagai hit/miss"""
+        if kunci in self.data:
+            self.hit += 1
+            return True, self.data[kunci]
+        self.miss += 1
+        return False, None
+
+    def simpan(self, kunci, nilai):
+        self.data[kunci] = nilai
+        return nilai
+
+    def ambil(self, kunci, hitung):
+        ada, nilai = self.cari(kunci)
+        return nilai if ada else self.simpan(kunci, hitung())
+
+    def bersihkan(self):
+        self.data.clear()
+
+
+def memo_aktif():
+    """MemoRequest milik request yang sedang berjalan (None di luar request)"""
+    return _memo_request.get()
+
+
+def memo_request(kunci, hitung):
+    """Hitung sekali per request untuk `kunci`; di luar request selalu dihitung"""
+    memo = _memo_request.get()
+    if memo is None:
+        return hitung()
+    return memo.ambil(kunci, hitung)
+
+
+def mulai_memo_request():
+    return _memo_request.set(MemoRequest())
+
+
+def selesai_memo_request(token):
+    _memo_request.reset(token)
+
+
+def bersihkan_memo_request():
+    """Dipanggil saat data berubah di tengah request supaya tidak ada hasil basi"""
+    memo = _memo_request.get()
+    if memo is not None:
+        memo.bersihkan()
+
+
+# ---------------------------------------------------------------------------
+# Cache data referensi (kriteria, produk, periode aktif) per proses worker.
+# Dibagi antar request; tiap entri dicatat bersama versi VersiData-nya dan
+# dimuat ulang kalau versinya naik (signal menaikkan versi saat model berubah).
+# Versi di DB dicek paling sering sekali tiap SPK_REFERENSI_TTL detik, jadi
+# perubahan dari worker lain terlihat paling lambat setelah TTL itu.
+# Nilai yang dikembalikan dibagi antar request, jadi jangan diubah.
+
+KUNCI_REFERENSI = ('kriteria', 'produk', 'periode', 'profil')
+
+_referensi = {}
+_versi_referensi = {'dicek': None, 'versi': {}}
+_kunci_referensi = threading.Lock()
+
+
+def versi_referensi():
+    """Versi kunci referensi ({kunci: versi}), dicek ulang ke DB setelah TTL habis"""
+    from .models import VersiData
+    ttl = getattr(settings, 'SPK_REFERENSI_TTL', 2.0)
+    dicek = _versi_referensi['dicek']
+    if dicek is None or time.monotonic() - dicek > ttl:
+        versi = dict(VersiData.objects.filter(kunci__in=KUNCI_REFERENSI).values_list('kunci', 'versi'))
+        with _kunci_referensi:
+            _versi_referensi['versi'] = {kunci: versi.get(kunci, 0) for kunci in KUNCI_REFERENSI}
+            _versi_referensi['dicek'] = time.monotonic()
+    return _versi_referensi['versi']
+
+
+def data_referensi(nama, kunci_versi, muat):
+    """Nilai referensi `nama`, dimuat ulang dengan `muat()` kalau versi `kunci_versi` berubah"""
+    versi = versi_referensi()[kunci_versi]
+    tersimpan = _referensi.get(nama)
+    if tersimpan is not None and tersimpan[0] == versi:
+        return tersimpan[1]
+    nilai = muat()
+    with _kunci_referensi:
+        _referensi[nama] = (versi, nilai)
+    return nilai
+
+
+def bersihkan_referensi():
+    """
+    Dipanggil saat versi data naik di proses ini: versi langsung dicek ulang
+    ke DB, sehingga hanya entri yang versinya berubah yang dimuat ulang.
+    """
+    with _kunci_referensi:
+        _versi_referensi['dicek'] = None
+
+
+def pastikan_versi_referensi(versi_db):
+    """
+    Dipanggil dengan versi yang baru dibaca dari DB ({kunci: versi}) sebelum
+    menghitung ranking: kalau cache proses ini masih memegang versi yang
+    lebih lama (TTL belum habis), versi langsung dicek ulang, supaya ranking
+    tidak dihitung dengan bobot/produk lama lalu disimpan dengan versi baru.
+    """
+    tersimpan = _versi_referensi['versi']
+    if any(tersimpan.get(kunci, -1) < versi for kunci, versi in versi_db.items()):
+        bersihkan_referensi()
+
+
+def _array_baca(nilai, dtype):
+    arr = np.array(nilai, dtype=dtype)
+    arr.flags.writeable = False
+    return arr
+
+
+def kriteria_referensi():
+    """
+    Semua kriteria urut kode, sebagai array sejajar: ids, kode, nama, bobot,
+    sifat, benefit (bool) dan bisa_diinput, plus peta kode -> id.
+    """
+    def muat():
+        from .models import Kriteria
+        baris = list(Kriteria.objects.order_by('kode').values_list(
+            'id', 'kode', 'nama', 'bobot', 'sifat', 'bisa_diinput_user'
+        ))
+        ids, kode, nama, bobot, sifat, bisa_diinput = zip(*baris) if baris else ((),) * 6
+        return {
+            'ids': _array_baca(ids, np.int64),
+            'kode': list(kode),
+            'nama': list(nama),
+            'bobot': _array_baca(bobot, float),
+            'sifat': list(sifat),
+            'benefit': _array_baca([s == 'benefit' for s in sifat], bool),
+            'bisa_diinput': _array_baca(bisa_diinput, bool),
+            'id_per_kode': dict(zip(kode, ids)),
+        }
+    return data_referensi('kriteria', 'kriteria', muat)
+
+
+def kriteria_id(kode):
+    """Id kriteria dengan kode tertentu (mis. 'C1' penjualan, 'C3' rating), None kalau tidak ada"""
+    return kriteria_referensi()['id_per_kode'].get(kode)
+
+
+def produk_referensi():
+    """Semua produk: ids (array urut id) dan nama ({id: nama})"""
+    def muat():
+        from .models import Produk
+        nama = dict(Produk.objects.order_by('id').values_list('id', 'nama'))
+        return {'ids': _array_baca(list(nama), np.int64), 'nama': nama}
+    return data_referensi('produk', 'produk', muat)
+
+
+def ambil_periode_aktif():
+    """Periode aktif terbaru (None kalau tidak ada)"""
+    def muat():
+        from .models import Periode
+        return Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+    return data_referensi('periode_aktif', 'periode', muat)
+
+
+# ---------------------------------------------------------------------------
+# Profil & role user disimpan di session, supaya tidak di-query tiap request.
+# Session mencatat versi kunci VersiData 'profil', yang dinaikkan signal tiap
+# kali UserProfile (siapa pun) disimpan/dihapus; versinya dibaca bersama
+# versi referensi (versi_referensi, paling sering sekali per
+# SPK_REFERENSI_TTL detik per proses), jadi request biasa tidak menjalankan
+# query profil sama sekali. Data session dengan versi lama (atau yang lebih
+# tua dari SPK_PROFIL_TTL detik) dimuat ulang dari DB.
+
+KUNCI_SESSION_PROFIL = '_spk_profil'
+KOLOM_PROFIL = ('id', 'role', 'phone', 'department', 'alamat')
+
+
+def naikkan_versi_profil():
+    """Tandai ada profil yang berubah; session yang menyimpan versi lama akan dimuat ulang"""
+    from .models import VersiData
+    VersiData.naikkan('profil')
+
+
+def ambil_profil(request):
+    """UserProfile user yang login (None kalau anonim / belum punya profil)"""
+    from .models import UserProfile
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    
+    versi = versi_referensi()['profil']
+    ttl = getattr(settings, 'SPK_PROFIL_TTL', 300)
+    data = request.session.get(KUNCI_SESSION_PROFIL)
+    if (data and data['user_id'] == user.pk and data['versi'] == versi
+            and time.time() - data['dimuat'] < ttl):
+        if data['profil'] is None:
+            return None
+        profil = UserProfile(user=user, **data['profil'])
+        profil._state.adding = False
+        return profil
+    
+    profil = UserProfile.objects.filter(user=user).first()
+    request.session[KUNCI_SESSION_PROFIL] = {
+        'user_id': user.pk,
+        'versi': versi,
+        'dimuat': time.time(),
+        'profil': {kolom: getattr(profil, kolom) for kolom in KOLOM_PROFIL} if profil else None,
+    }
+    return profil
@@ -0,0 +1,90 @@
+import csv
+import json
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from .models import HasilRanking, NilaiProduk, Periode
+from .ranking import PERIODE_PER_BATCH, segarkan_ranking
+
+KOLOM_RANKING = ['periode', 'rank', 'produk_id', 'produk', 'nilai']
+KOLOM_NILAI = ['periode', 'produk_id', 'produk', 'kriteria', 'nilai', 'created_by', 'updated_at']
+
+# jumlah baris per query halaman (keyset)
+UKURAN_CHUNK = 2000
+
+
+def baris_ranking(periode_list):
+    """
+    Baris ranking per periode, dibaca per halaman UKURAN_CHUNK baris dengan
+    keyset rank (index periode, versi, rank). Bukan iterator(): di MySQL
+    tanpa server-side cursor, iterator() tetap menampung seluruh hasil.
+    """
+    periode_list = list(periode_list)
+    for awal in range(0, len(periode_list), PERIODE_PER_BATCH):
+        batch = periode_list[awal:awal + PERIODE_PER_BATCH]
+        versi = segarkan_ranking(batch)
+        for periode in batch:
+            query = HasilRanking.objects.filter(
+                periode_id=periode.id, versi=versi[periode.id]
+            ).order_by('rank').values_list('rank', 'produk_id', 'produk__nama', 'nilai')
+            rank_terakhir = 0
+            while True:
+                halaman = list(query.filter(rank__gt=rank_terakhir)[:UKURAN_CHUNK])
+                for rank, produk_id, produk, nilai in halaman:
+                    yield periode.nama, rank, produk_id, produk, nilai
+                if len(halaman) < UKURAN_CHUNK:
+                    break
+                rank_terakhir = halaman[-1][0]
+
+
+def baris_nilai(periode=None):
+    """
+    Dump mentah NilaiProduk (semua periode, atau satu periode), per periode
+    dan per halaman UKURAN_CHUNK baris dengan keyset (produk_id, kode kriteria).
+    """
+    periode_list = [periode] if periode else Periode.objects.order_by('tanggal_mulai', 'id')
+    for periode in periode_list:
+        query = NilaiProduk.objects.filter(periode=periode).order_by('produk_id', 'kriteria__kode').values_list(
+            'produk_id', 'produk__nama', 'kriteria__kode', 'nilai', 'created_by__username', 'updated_at',
+        )
+        setelah = Q()
+        while True:
+            halaman = list(query.filter(setelah)[:UKURAN_CHUNK])
+            for row in halaman:
+                yield (periode.nama, *row)
+            if len(halaman) < UKURAN_CHUNK:
+                break
+            produk_id, _, kode = halaman[-1][:3]
+            setelah = Q(produk_id__gt=produk_id) | Q(produk_id=produk_id, kriteria__kode__gt=kode)
+
+
+class _Echo:
+    """File palsu untuk csv.writer: write() langsung mengembalikan barisnya"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(kolom, baris):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(kolom)
+    for row in baris:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(kolom, baris):
+    for row in baris:
+        yield json.dumps(dict(zip(kolom, row)), default=str) + '\n'
+
+
+FORMAT_STREAM = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+def streaming_response(format_ekspor, kolom, baris, filename):
+    """StreamingHttpResponse CSV/NDJSON; baris dibuat lazily saat dikirim"""
+    stream, content_type = FORMAT_STREAM[format_ekspor]
+    response = StreamingHttpResponse(stream(kolom, baris), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{format_ekspor}"'
+    return response
@@ -0,0 +1,160 @@
+import csv
+import math
+import re
+import time
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Produk, Kriteria, NilaiProduk, Periode, VersiData, PeriodeKotor
+
+KOLOM_WAJIB = ('produk', 'kriteria', 'nilai')
+# batas jumlah pesan error per baris yang disimpan di laporan
+MAKS_ERROR = 500
+# koma sebagai pemisah desimal hanya diterima kalau tidak mungkin pemisah
+# ribuan (bukan tepat 3 digit di belakangnya, misalnya "1,5")
+_KOMA_DESIMAL = re.compile(r'^[+-]?\d+,(\d{1,2}|\d{4,})$')
+
+
+def impor_nilai_csv(berkas, periode=None, user=None, ukuran_chunk=1000, hanya_kriteria_user=False,
+                    hanya_periode_default=False):
+    """
+    Import NilaiProduk dari CSV (file teks) secara streaming.
+
+    Kolom wajib: produk (nama), kriteria (kode), nilai. Kolom opsional
+    `periode` (nama periode); kalau kosong dipakai `periode`. Dengan
+    hanya_periode_default=True, baris untuk periode lain ditolak. Baris divalidasi
+    dengan peta lookup yang dimuat sekali di awal, lalu ditulis per chunk
+    dengan bulk_create(update_conflicts=True) pada (produk, kriteria, periode).
+    Mengembalikan laporan: jumlah baris, tersimpan, gagal, durasi, baris/detik, errors.
+    """
+    mulai = time.perf_counter()
+    laporan = {'total': 0, 'tersimpan': 0, 'gagal': 0, 'errors': []}
+    
+    reader = csv.DictReader(berkas)
+    kolom = [k.strip().lower() for k in (reader.fieldnames or [])]
+    kurang = [k for k in KOLOM_WAJIB if k not in kolom]
+    if kurang:
+        laporan['errors'].append((1, f"Kolom wajib tidak ada: {', '.join(kurang)}"))
+        return _selesai(laporan, mulai)
+    reader.fieldnames = kolom
+    
+    # peta lookup dimuat sekali, bukan query per baris
+    produk_map = {nama.strip().lower(): pid for pid, nama in Produk.objects.values_list('id', 'nama')}
+    kriteria_query = Kriteria.objects.all()
+    if hanya_kriteria_user:
+        kriteria_query = kriteria_query.filter(bisa_diinput_user=True)
+    kriteria_map = {kode.strip().upper(): kid for kid, kode in kriteria_query.values_list('id', 'kode')}
+    periode_query = Periode.objects.all()
+    if hanya_periode_default:
+        periode_query = periode_query.filter(id=periode.id if periode else None)
+    periode_map = {nama.strip().lower(): pid for pid, nama in periode_query.values_list('id', 'nama')}
+    
+    chunk = {}
+    for nomor, row in enumerate(reader, start=2):
+        laporan['total'] += 1
+        try:
+            obj = _baris_ke_nilai(row, produk_map, kriteria_map, periode_map, periode, user)
+        except ValueError as e:
+            laporan['gagal'] += 1
+            if len(laporan['errors']) < MAKS_ERROR:
+                laporan['errors'].append((nomor, str(e)))
+            continue
+        
+        # baris dengan kunci sama di satu chunk: yang terakhir menang
+        chunk[(obj.produk_id, obj.kriteria_id, obj.periode_id)] = obj
+        if len(chunk) >= ukuran_chunk:
+            laporan['tersimpan'] += _tulis_chunk(chunk.values(), ganti_pembuat=user is not None)
+            chunk = {}
+    
+    if chunk:
+        laporan['tersimpan'] += _tulis_chunk(chunk.values(), ganti_pembuat=user is not None)
+    
+    return _selesai(laporan, mulai)
+
+
+def _baris_ke_nilai(row, produk_map, kriteria_map, periode_map, periode, user):
+    produk_nama = (row.get('produk') or '').strip()
+    produk_id = produk_map.get(produk_nama.lower())
+    if produk_id is None:
+        raise ValueError(f"Produk '{produk_nama}' tidak ditemukan")
+    
+    kode = (row.get('kriteria') or '').strip()
+    kriteria_id = kriteria_map.get(kode.upper())
+    if kriteria_id is None:
+        raise ValueError(f"Kriteria '{kode}' tidak ditemukan atau tidak boleh diinput")
+    
+    periode_nama = (row.get('periode') or '').strip()
+    if periode_nama:
+        periode_id = periode_map.get(periode_nama.lower())
+        if periode_id is None:
+            raise ValueError(f"Periode '{periode_nama}' tidak ditemukan atau tidak boleh diimport")
+    elif periode:
+        periode_id = periode.id
+    else:
+        raise ValueError("Periode kosong dan tidak ada periode default")
+    
+    nilai = _parse_nilai(row.get('nilai'))
+    
+    return NilaiProduk(
+        produk_id=produk_id,
+        kriteria_id=kriteria_id,
+        periode_id=periode_id,
+        nilai=nilai,
+        created_by=user,
+    )
+
+
+def _parse_nilai(teks):
+    """
+    Angka dari sel CSV. Titik adalah pemisah desimal; koma hanya diterima
+    sebagai desimal kalau tidak ambigu. NaN/inf ditolak.
+    """
+    teks = (teks or '').strip()
+    if ',' in teks:
+        if not _KOMA_DESIMAL.match(teks):
+            raise ValueError(f"Nilai '{teks}' ambigu: pakai titik sebagai pemisah desimal, tanpa pemisah ribuan")
+        teks = teks.replace(',', '.')
+    try:
+        nilai = float(teks)
+    except ValueError:
+        raise ValueError(f"Nilai '{teks}' bukan angka")
+    if not math.isfinite(nilai):
+        raise ValueError(f"Nilai '{teks}' bukan angka yang valid")
+    return nilai
+
+
+def _tulis_chunk(objs, ganti_pembuat=True):
+    """
+    Upsert satu chunk; MySQL tidak menerima unique_fields pada ON DUPLICATE KEY.
+    Tanpa `ganti_pembuat`, created_by baris yang sudah ada tidak ditimpa.
+    Versi data & antrian worker diperbarui di transaksi yang sama, jadi chunk
+    yang sudah tersimpan selalu membuat ranking periodenya basi.
+    """
+    objs = list(objs)
+    sekarang = timezone.now()
+    periode_berubah = set()
+    for obj in objs:
+        obj.updated_at = sekarang
+        periode_berubah.add(obj.periode_id)
+    
+    update_fields = ['nilai', 'created_by', 'updated_at'] if ganti_pembuat else ['nilai', 'updated_at']
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['produk', 'kriteria', 'periode']
+    with transaction.atomic():
+        NilaiProduk.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        # bulk_create tidak memicu signal, jadi versi data dinaikkan manual
+        for periode_id in periode_berubah:
+            VersiData.naikkan(VersiData.kunci_periode(periode_id))
+        PeriodeKotor.tandai(periode_berubah)
+    return len(objs)
+
+
+def _selesai(laporan, mulai):
+    laporan['durasi'] = time.perf_counter() - mulai
+    laporan['baris_per_detik'] = laporan['total'] / laporan['durasi'] if laporan['durasi'] else 0
+    return laporan
@@ -0,0 +1,129 @@
+import threading
+import numpy as np
+from .instrumentasi import diukur
+from .cache import kriteria_referensi, produk_referensi
+from .models import VersiData
+from .ranking import hasil_dari_array, simpan_ranking
+from .tabel import TabelRanking
+from .utils import muat_matriks_keputusan, ranking_dari_nilai
+
+# statistik per periode yang disimpan di memori proses: {periode_id: StatistikTopsis}
+_statistik = {}
+_kunci = threading.Lock()
+
+
+class StatistikTopsis:
+    """
+    Statistik berjalan TOPSIS satu periode: matriks keputusan plus
+    jumlah kuadrat, nilai max dan min tiap kolom kriteria. Dengan ini
+    update satu sel cukup memperbarui statistik kolomnya, lalu nilai
+    preferensi dihitung ulang tanpa memuat ulang data dari database.
+    """
+
+    def __init__(self, periode_id, versi, X, produk_ids, kriteria_ids, bobot, benefit, produk_nama):
+        self.periode_id = periode_id
+        self.versi = versi
+        self.X = X
+        self.produk_ids = produk_ids
+        self.kriteria_ids = kriteria_ids
+        self.bobot = np.asarray(bobot, dtype=float)
+        self.benefit = np.asarray(benefit, dtype=bool)
+        self.produk_nama = produk_nama
+        self.baris = {pid: i for i, pid in enumerate(produk_ids.tolist())}
+        self.kolom = {kid: j for j, kid in enumerate(kriteria_ids.tolist())}
+        self.hitung_ulang_statistik()
+
+    @classmethod
+    def dari_database(cls, periode_id, versi):
+        kriteria = kriteria_referensi()
+        produk = produk_referensi()
+        X, produk_ids, kriteria_ids = muat_matriks_keputusan(
+            periode_id,
+            produk_ids=produk['ids'],
+            kriteria_ids=kriteria['ids'],
+        )
+        return cls(
+            periode_id, versi, X.copy(), produk_ids, kriteria_ids,
+            kriteria['bobot'], kriteria['benefit'], produk['nama'],
+        )
+
+    def hitung_ulang_statistik(self):
+        """Hitung ulang penuh statistik semua kolom dari matriks di memori"""
+        self.jumlah_kuadrat = np.sum(self.X**2, axis=0)
+        self.kolom_max = np.max(self.X, axis=0, initial=-np.inf)
+        self.kolom_min = np.min(self.X, axis=0, initial=np.inf)
+
+    def perbarui(self, produk_id, kriteria_id, nilai_baru):
+        """
+        Terapkan upsert satu sel. Return False kalau sel tidak dikenal
+        (produk/kriteria baru) sehingga statistik harus dimuat ulang.
+        """
+        i = self.baris.get(produk_id)
+        j = self.kolom.get(kriteria_id)
+        if i is None or j is None:
+            return False
+        
+        nilai_lama = self.X[i, j]
+        self.X[i, j] = nilai_baru
+        self.jumlah_kuadrat[j] += nilai_baru**2 - nilai_lama**2
+        
+        # nilai ekstrem kolom hilang -> statistik harus dihitung ulang penuh
+        if (nilai_lama == self.kolom_max[j] and nilai_baru < nilai_lama) or \
+                (nilai_lama == self.kolom_min[j] and nilai_baru > nilai_lama):
+            self.hitung_ulang_statistik()
+        else:
+            self.kolom_max[j] = max(self.kolom_max[j], nilai_baru)
+            self.kolom_min[j] = min(self.kolom_min[j], nilai_baru)
+        return True
+
+    @diukur('topsis')
+    def preferensi(self):
+        """Nilai preferensi TOPSIS dari statistik berjalan, O(produk x kriteria)"""
+        pembagi = np.sqrt(np.maximum(self.jumlah_kuadrat, 0))
+        pembagi[pembagi == 0] = 1e-10
+        skala = self.bobot / pembagi
+        
+        # max/min terbobot per kolom (skala negatif membalik max <-> min)
+        terbobot_max = np.where(skala >= 0, self.kolom_max, self.kolom_min) * skala
+        terbobot_min = np.where(skala >= 0, self.kolom_min, self.kolom_max) * skala
+        A_plus = np.where(self.benefit, terbobot_max, terbobot_min)
+        A_minus = np.where(self.benefit, terbobot_min, terbobot_max)
+        
+        V = self.X * skala
+        D_plus = np.sqrt(np.sum((V - A_plus)**2, axis=1))
+        D_minus = np.sqrt(np.sum((V - A_minus)**2, axis=1))
+        return D_minus / (D_plus + D_minus + 1e-10)
+
+
+def perbarui_ranking_inkremental(nilai_obj):
+    """
+    Dipanggil setelah satu NilaiProduk disimpan: perbarui statistik
+    periode tersebut lalu simpan ranking baru ke HasilRanking, sehingga
+    halaman berikutnya langsung membaca ranking yang sudah segar.
+    """
+    periode = nilai_obj.periode
+    # versi ini sudah termasuk kenaikan dari signal save barusan
+    versi = VersiData.versi_periode(periode.id)
+    
+    with _kunci:
+        stat = _statistik.get(periode.id)
+        # statistik hanya bisa dipakai kalau save ini satu-satunya perubahan sejak dibuat
+        bisa_inkremental = (
+            stat is not None
+            and stat.versi == versi - 1
+            and stat.perbarui(nilai_obj.produk_id, nilai_obj.kriteria_id, float(nilai_obj.nilai))
+        )
+        if not bisa_inkremental:
+            stat = StatistikTopsis.dari_database(periode.id, versi)
+        stat.versi = versi
+        _statistik[periode.id] = stat
+        
+        if not len(stat.produk_ids) or not len(stat.kriteria_ids):
+            return TabelRanking(periode.nama)
+        nilai = stat.preferensi()
+        hasil = hasil_dari_array(
+            periode, stat.produk_ids, stat.produk_nama, nilai, ranking_dari_nilai(nilai)
+        )
+    
+    simpan_ranking(periode, hasil, versi)
+    return hasil
@@ -0,0 +1,109 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from django import shortcuts
+
+# catatan waktu milik request yang sedang berjalan (diisi oleh ServerTimingMiddleware)
+_catatan_request = contextvars.ContextVar('spk_catatan_request', default=None)
+
+
+class CatatanRequest:
+    """Akumulasi jumlah query, waktu DB dan waktu per bagian (topsis, template) satu request"""
+
+    def __init__(self):
+        self.query = []
+        self.bagian = {}
+        self._aktif = set()
+        self._kunci = threading.Lock()
+
+    @property
+    def jumlah_query(self):
+        return len(self.query)
+
+    @property
+    def waktu_db(self):
+        return sum(durasi for _, durasi in self.query)
+
+    def bungkus_query(self, execute, sql, params, many, context):
+        """execute_wrapper Django: catat SQL dan durasinya"""
+        mulai = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query.append((sql, time.perf_counter() - mulai))
+
+    def query_terlambat(self, jumlah=5):
+        return sorted(self.query, key=lambda q: q[1], reverse=True)[:jumlah]
+
+    def gabung(self, lain):
+        """Tambahkan catatan milik thread lain (lihat spk.api._di_thread)"""
+        with self._kunci:
+            self.query.extend(lain.query)
+            for nama, durasi in lain.bagian.items():
+                self.bagian[nama] = self.bagian.get(nama, 0) + durasi
+
+
+def catatan_aktif():
+    return _catatan_request.get()
+
+
+def _bungkus_query(execute, sql, params, many, context):
+    catatan = _catatan_request.get()
+    if catatan is None:
+        return execute(sql, params, many, context)
+    return catatan.bungkus_query(execute, sql, params, many, context)
+
+
+def pasang_pencatat_query(sender, connection, **kwargs):
+    """
+    Signal connection_created: query tiap koneksi dicatat ke CatatanRequest
+    yang aktif di context saat itu. Koneksi DB milik thread, tapi context
+    ikut disalin sync_to_async, jadi query dari view async dan thread pool
+    juga tercatat ke request-nya.
+    """
+    if _bungkus_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_bungkus_query)
+
+
+def mulai_catatan():
+    catatan = CatatanRequest()
+    return catatan, _catatan_request.set(catatan)
+
+
+def selesai_catatan(token):
+    _catatan_request.reset(token)
+
+
+@contextmanager
+def ukur_bagian(nama):
+    """Tambahkan durasi blok ke bagian `nama`; panggilan bersarang dengan nama sama dihitung sekali"""
+    catatan = _catatan_request.get()
+    if catatan is None or nama in catatan._aktif:
+        yield
+        return
+    catatan._aktif.add(nama)
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        catatan._aktif.discard(nama)
+        catatan.bagian[nama] = catatan.bagian.get(nama, 0) + time.perf_counter() - mulai
+
+
+def diukur(nama):
+    """Dekorator: waktu eksekusi fungsi dicatat sebagai bagian `nama`"""
+    def decorator(fungsi):
+        @functools.wraps(fungsi)
+        def wrapper(*args, **kwargs):
+            with ukur_bagian(nama):
+                return fungsi(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render(request, template_name, context=None, *args, **kwargs):
+    """django.shortcuts.render yang waktu render template-nya ikut dicatat"""
+    with ukur_bagian('template'):
+        return shortcuts.render(request, template_name, context, *args, **kwargs)
@@ -0,0 +1,69 @@
+"""
+Conditional GET (ETag / Last-Modified) untuk halaman ranking & export.
+Versi data diambil dari VersiData (satu query), jadi request yang datanya
+belum berubah dijawab 304 sebelum ranking dihitung atau dibaca.
+"""
+import hashlib
+from django.db.models import Max, Q, Sum
+from django.views.decorators.http import condition
+from .cache import ambil_periode_aktif
+from .models import VersiData, PeriodeKotor
+
+# kunci yang mempengaruhi semua halaman ranking (daftar periode ikut tampil)
+KUNCI_DASAR = ['kriteria', 'produk', 'periode']
+
+
+def versi_data(periode_id=None):
+    """
+    (versi, terakhir_diubah) data yang dipakai ranking satu periode, atau
+    seluruh data kalau periode_id None. Versi adalah jumlah versi semua
+    kunci terkait; karena tiap versi hanya bisa naik, jumlahnya juga.
+    """
+    query = VersiData.objects.all()
+    if periode_id is not None:
+        query = query.filter(kunci__in=KUNCI_DASAR + [VersiData.kunci_periode(periode_id)])
+    hasil = query.aggregate(versi=Sum('versi'), diperbarui=Max('diperbarui'))
+    return hasil['versi'] or 0, hasil['diperbarui']
+
+
+def _validator(request, periode_id, semua):
+    """ETag & Last-Modified satu request (dihitung sekali, dipakai kedua fungsi condition)"""
+    if hasattr(request, '_spk_validator'):
+        return request._spk_validator
+
+    if not semua and periode_id is None:
+        periode = ambil_periode_aktif()
+        periode_id = periode.id if periode else 0
+    versi, diperbarui = versi_data(None if semua else periode_id)
+
+    # ranking yang sedang antri dihitung ulang oleh worker bisa berubah tanpa
+    # versi data berubah: ETag ikut berubah, Last-Modified tidak dipakai
+    antri = PeriodeKotor.objects.filter(Q() if semua else Q(periode_id=periode_id)).exists()
+    if antri:
+        diperbarui = None
+
+    # halaman berisi nama & role user, jadi user ikut menentukan ETag
+    profil = getattr(request, 'profile', None)
+    bagian = [versi, periode_id, int(antri), request.user.pk, profil.role if profil else '']
+    etag = hashlib.md5('-'.join(map(str, bagian)).encode()).hexdigest()
+    request._spk_validator = (etag, diperbarui)
+    return request._spk_validator
+
+
+def kondisional_ranking(semua=None):
+    """
+    Decorator view: jawab 304 kalau data ranking belum berubah sejak
+    response yang dipegang client. Periode diambil dari kwarg `periode_id`
+    (default periode aktif); semua(request, *args, **kwargs) -> True berarti
+    response memakai data semua periode.
+    """
+    def cek(request, *args, **kwargs):
+        return _validator(
+            request,
+            kwargs.get('periode_id'),
+            bool(semua and semua(request, *args, **kwargs)),
+        )
+    return condition(
+        etag_func=lambda request, *args, **kwargs: cek(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: cek(request, *args, **kwargs)[1],
+    )
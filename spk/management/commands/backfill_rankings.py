@@ -0,0 +1,42 @@
+import os
+from django.core.management.base import BaseCommand
+from spk.backfill import backfill_ranking
+from spk.models import Periode
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang ranking seluruh riwayat periode memakai beberapa proses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Jumlah proses worker (default: jumlah core)')
+        parser.add_argument('--chunk', type=int, default=12, help='Jumlah periode per tugas worker')
+        parser.add_argument('--batch-tulis', type=int, default=48,
+                            help='Jumlah periode yang ditulis ke HasilRanking per transaksi')
+        parser.add_argument('--paksa', action='store_true',
+                            help='Hitung ulang juga periode yang rankingnya sudah sesuai versi data')
+
+    def handle(self, *args, **options):
+        periode_list = list(Periode.objects.order_by('tanggal_mulai'))
+        self.stdout.write(
+            f"backfill ranking {len(periode_list)} periode dengan {options['workers']} worker"
+            + ('' if options['paksa'] else ' (periode yang sudah terbaru dilewati)')
+        )
+
+        def progres(selesai, total, detik):
+            self.stdout.write(
+                f'{selesai}/{total} periode ({selesai / total:.0%}) dalam {detik:.1f} detik, '
+                f'{selesai / detik if detik else 0:.1f} periode/detik'
+            )
+
+        jumlah = backfill_ranking(
+            periode_list,
+            workers=options['workers'],
+            ukuran_chunk=options['chunk'],
+            ukuran_tulis=options['batch_tulis'],
+            paksa=options['paksa'],
+            progres=progres,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{jumlah} periode dihitung ulang, {len(periode_list) - jumlah} sudah terbaru'
+        ))
@@ -0,0 +1,55 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from spk import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Buat data sintetis di database test terpisah lalu ukur waktu, jumlah query '
+        'dan memori puncak jalur ranking, analytics dan view; bandingkan dengan baseline JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produk', type=int, default=10000)
+        parser.add_argument('--kriteria', type=int, default=20)
+        parser.add_argument('--periode', type=int, default=60)
+        parser.add_argument('--isi', type=float, default=0.95, help='Porsi sel yang punya nilai')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--ulang', type=int, default=3, help='Jumlah pengulangan tiap kasus')
+        parser.add_argument('--baseline', default='benchmark_baseline.json')
+        parser.add_argument('--simpan-baseline', action='store_true', help='Tulis hasil sebagai baseline baru')
+        parser.add_argument('--toleransi', type=float, default=0.25, help='Batas perlambatan relatif sebelum dianggap regresi')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nama_db_lama = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            ukuran = {k: options[k] for k in ('produk', 'kriteria', 'periode', 'isi', 'seed')}
+            self.stdout.write(f'Membuat data sintetis {ukuran}...')
+            benchmark.buat_data_sintetis(
+                options['produk'], options['kriteria'], options['periode'],
+                isi=options['isi'], seed=options['seed'], log=self.stdout.write,
+            )
+            hasil = benchmark.jalankan_benchmark(options['ulang'], log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(nama_db_lama, verbosity=0)
+            teardown_test_environment()
+        
+        path = options['baseline']
+        if options['simpan_baseline']:
+            benchmark.simpan_baseline(path, hasil, ukuran)
+            self.stdout.write(self.style.SUCCESS(f'Baseline disimpan ke {path}'))
+            return
+        if not os.path.exists(path):
+            self.stdout.write(f'Belum ada baseline di {path}; jalankan dengan --simpan-baseline.')
+            return
+        
+        regresi = benchmark.bandingkan_baseline(hasil, benchmark.baca_baseline(path), options['toleransi'])
+        if regresi:
+            for baris in regresi:
+                self.stderr.write(self.style.ERROR(f'REGRESI {baris}'))
+            raise CommandError(f'{len(regresi)} regresi dibanding baseline {path}')
+        self.stdout.write(self.style.SUCCESS('Tidak ada regresi dibanding baseline.'))
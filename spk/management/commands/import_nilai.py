@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from spk.importer import impor_nilai_csv
+from spk.models import Periode
+
+
+class Command(BaseCommand):
+    help = 'Import NilaiProduk dari file CSV (kolom: produk, kriteria, nilai[, periode])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help='Path file CSV')
+        parser.add_argument('--periode', help='Nama atau id periode default (default: periode aktif)')
+        parser.add_argument('--user', help='Username yang dicatat sebagai created_by')
+        parser.add_argument('--chunk', type=int, default=1000, help='Jumlah baris per bulk_create')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        periode = self._periode(options['periode'])
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' tidak ditemukan")
+        
+        try:
+            with open(options['csv'], newline='', encoding=options['encoding']) as berkas:
+                laporan = impor_nilai_csv(berkas, periode=periode, user=user, ukuran_chunk=options['chunk'])
+        except OSError as e:
+            raise CommandError(str(e))
+        
+        for nomor, pesan in laporan['errors']:
+            self.stderr.write(f'Baris {nomor}: {pesan}')
+        self.stdout.write(self.style.SUCCESS(
+            f"{laporan['tersimpan']} nilai tersimpan, {laporan['gagal']} baris gagal "
+            f"dari {laporan['total']} baris dalam {laporan['durasi']:.2f} detik "
+            f"({laporan['baris_per_detik']:.0f} baris/detik)"
+        ))
+
+    def _periode(self, nilai):
+        if not nilai:
+            return Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+        periode = Periode.objects.filter(nama=nilai).first()
+        if periode is None and nilai.isdigit():
+            periode = Periode.objects.filter(id=int(nilai)).first()
+        if periode is None:
+            raise CommandError(f"Periode '{nilai}' tidak ditemukan")
+        return periode
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from spk.ranking import proses_antrian
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang ranking periode yang ada di antrian PeriodeKotor (tanpa broker eksternal)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'SPK_WORKER_INTERVAL', 2.0),
+                            help='Detik antar pengecekan antrian')
+        parser.add_argument('--jeda', type=float, default=getattr(settings, 'SPK_WORKER_JEDA', 5.0),
+                            help='Periode baru dihitung setelah tidak ada penulisan selama sekian detik')
+        parser.add_argument('--maks-tunda', type=float, default=getattr(settings, 'SPK_WORKER_MAKS_TUNDA', 60.0),
+                            help='Batas tunggu (detik) walaupun penulisan masih terus berlangsung')
+        parser.add_argument('--batch', type=int, default=12, help='Jumlah periode per batch perhitungan')
+        parser.add_argument('--sekali', action='store_true', help='Proses antrian sekali lalu berhenti')
+
+    def handle(self, *args, **options):
+        jeda = timedelta(seconds=options['jeda'])
+        maks_tunda = timedelta(seconds=options['maks_tunda'])
+        if options['sekali']:
+            jeda = maks_tunda = timedelta(0)
+
+        self.stdout.write(f"ranking_worker jalan (interval {options['interval']}s, jeda {options['jeda']}s)")
+        try:
+            while True:
+                close_old_connections()
+                mulai = time.perf_counter()
+                try:
+                    diproses = proses_antrian(jeda, maks_tunda, ukuran_batch=options['batch'])
+                except Exception as e:
+                    self.stderr.write(f'Error saat menghitung ranking: {e}')
+                    diproses = []
+
+                if diproses:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{len(diproses)} periode dihitung ulang dalam "
+                        f"{time.perf_counter() - mulai:.2f} detik: {', '.join(p.nama for p in diproses)}"
+                    ))
+                    # masih ada sisa antrian yang siap: lanjut tanpa menunggu
+                    if len(diproses) == options['batch']:
+                        continue
+                if options['sekali']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('ranking_worker berhenti')
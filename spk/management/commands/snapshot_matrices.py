@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from spk.models import Periode
+from spk.snapshot import direktori_snapshot, tulis_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Tulis snapshot matriks keputusan per periode (.npy/.npz) untuk analisis offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('periode', nargs='*', help='Nama atau id periode (default: semua periode)')
+        parser.add_argument('--output', help='Folder tujuan (default: MEDIA_ROOT/snapshot)')
+        parser.add_argument('--batch', type=int, default=12, help='Jumlah periode per query')
+        parser.add_argument('--paksa', action='store_true',
+                            help='Tulis ulang walaupun snapshot sudah sesuai versi data')
+
+    def handle(self, *args, **options):
+        if options['periode']:
+            periode_list = [self._periode(nilai) for nilai in options['periode']]
+        else:
+            periode_list = list(Periode.objects.order_by('tanggal_mulai'))
+        direktori = direktori_snapshot(options['output'])
+
+        mulai = time.perf_counter()
+        ditulis = 0
+        for periode, status in tulis_snapshot(
+            periode_list, direktori, ukuran_batch=options['batch'], paksa=options['paksa'],
+        ):
+            if status == 'ditulis':
+                ditulis += 1
+                self.stdout.write(f'{periode.nama}: ditulis')
+            else:
+                self.stdout.write(f'{periode.nama}: sudah terbaru, dilewati')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{ditulis} dari {len(periode_list)} periode ditulis ke {direktori} '
+            f'dalam {time.perf_counter() - mulai:.2f} detik'
+        ))
+
+    def _periode(self, nilai):
+        periode = Periode.objects.filter(nama=nilai).first()
+        if periode is None and nilai.isdigit():
+            periode = Periode.objects.filter(id=int(nilai)).first()
+        if periode is None:
+            raise CommandError(f"Periode '{nilai}' tidak ditemukan")
+        return periode
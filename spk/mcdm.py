@@ -0,0 +1,159 @@
+"""
+Registry metode MCDM (TOPSIS, SAW, WP, VIKOR) yang berjalan sebagai kernel
+numpy di atas matriks keputusan yang sama. Semua kernel menerima
+X berbentuk (..., produk, kriteria), bobot dan mask benefit, lalu
+mengembalikan skor (..., produk) dengan arti "lebih besar lebih baik".
+"""
+import numpy as np
+from .cache import kriteria_referensi, produk_referensi
+from .utils import hitung_preferensi_topsis, muat_matriks_keputusan, indeks_teratas
+
+# {kode: (label, kernel)}
+METODE = {}
+METODE_DEFAULT = 'topsis'
+
+
+def daftar_metode(kode, label):
+    """Dekorator untuk mendaftarkan kernel metode baru"""
+    def decorator(kernel):
+        METODE[kode] = (label, kernel)
+        return kernel
+    return decorator
+
+
+def bobot_ternormalisasi(bobot):
+    """Bobot dibagi totalnya (jumlah = 1)"""
+    bobot = np.asarray(bobot, dtype=float)
+    total = bobot.sum()
+    return bobot / total if total else bobot
+
+
+def normalisasi_linear(X, benefit):
+    """Normalisasi min-max per kolom: 1 = nilai terbaik, 0 = terburuk (arah benefit/cost)"""
+    benefit = np.asarray(benefit, dtype=bool)
+    kolom_max = X.max(axis=-2, keepdims=True)
+    kolom_min = X.min(axis=-2, keepdims=True)
+    rentang = kolom_max - kolom_min
+    rentang = np.where(rentang == 0, 1e-10, rentang)
+    return np.where(benefit, X - kolom_min, kolom_max - X) / rentang
+
+
+@daftar_metode('topsis', 'TOPSIS')
+def topsis(X, bobot, benefit):
+    return hitung_preferensi_topsis(X, bobot, benefit)
+
+
+@daftar_metode('saw', 'SAW')
+def saw(X, bobot, benefit):
+    """
+    Simple Additive Weighting: benefit x/max, cost min/x, lalu jumlah terbobot.
+    Sel <= 0 (nilai belum diinput) dianggap tidak ada: rating-nya 0, dan tidak
+    ikut menentukan max/min kolom.
+    """
+    benefit = np.asarray(benefit, dtype=bool)
+    ada = X > 0
+    kolom_max = np.where(ada, X, 0).max(axis=-2, keepdims=True)
+    kolom_min = np.where(ada, X, np.inf).min(axis=-2, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(benefit, X / kolom_max, kolom_min / X)
+    r = np.where(ada, r, 0.0)
+    return r @ bobot_ternormalisasi(bobot)
+
+
+@daftar_metode('wp', 'WP')
+def wp(X, bobot, benefit):
+    """
+    Weighted Product: prod(x ^ +-w) (dihitung di ruang log), dinormalisasi jadi vektor V.
+    Sel <= 0 (nilai belum diinput) diganti nilai terburuk kolomnya (benefit:
+    min positif, cost: max), supaya tidak menjadi log(0) atau justru
+    melambung ke rank 1 lewat pangkat negatif.
+    """
+    benefit = np.asarray(benefit, dtype=bool)
+    pangkat = bobot_ternormalisasi(bobot) * np.where(benefit, 1.0, -1.0)
+    ada = X > 0
+    terburuk = np.where(
+        benefit,
+        np.where(ada, X, np.inf).min(axis=-2, keepdims=True),
+        np.where(ada, X, 0).max(axis=-2, keepdims=True),
+    )
+    # kolom tanpa nilai sama sekali: 1 (log 1 = 0, tidak mempengaruhi skor)
+    terburuk = np.where(np.isfinite(terburuk) & (terburuk > 0), terburuk, 1.0)
+    log_S = np.log(np.where(ada, X, terburuk)) @ pangkat
+    log_S = log_S - log_S.max(axis=-1, keepdims=True)
+    S = np.exp(log_S)
+    return S / S.sum(axis=-1, keepdims=True)
+
+
+@daftar_metode('vikor', 'VIKOR')
+def vikor(X, bobot, benefit, v=0.5):
+    """VIKOR: indeks Q (kecil = baik) dari utility S dan regret R; skor = 1 - Q"""
+    jarak = (1 - normalisasi_linear(X, benefit)) * bobot_ternormalisasi(bobot)
+    S = jarak.sum(axis=-1)
+    R = jarak.max(axis=-1)
+    
+    def skala(a):
+        a_min = a.min(axis=-1, keepdims=True)
+        rentang = a.max(axis=-1, keepdims=True) - a_min
+        return (a - a_min) / np.where(rentang == 0, 1e-10, rentang)
+    
+    Q = v * skala(S) + (1 - v) * skala(R)
+    return 1 - Q
+
+
+def muat_data_mcdm(periode):
+    """Data bersama semua metode: matriks keputusan, bobot, benefit dan nama produk"""
+    kriteria = kriteria_referensi()
+    produk = produk_referensi()
+    X, produk_ids, _ = muat_matriks_keputusan(
+        periode.id,
+        produk_ids=produk['ids'],
+        kriteria_ids=kriteria['ids'],
+    )
+    return {
+        'X': X,
+        'produk_ids': produk_ids,
+        'produk_nama': produk['nama'],
+        'bobot': kriteria['bobot'],
+        'benefit': kriteria['benefit'],
+    }
+
+
+def hitung_banyak_metode(periode, metode_list=None, limit=None, offset=0):
+    """
+    Ranking satu periode dengan beberapa metode sekaligus; data hanya dimuat sekali.
+    Mengembalikan {kode_metode: list dict (format hitung_topsis + 'metode')}.
+    Dengan `limit`, hanya rank offset+1 .. offset+limit yang dibentuk (seleksi top-k).
+    """
+    metode_list = metode_list or list(METODE)
+    tidak_dikenal = [m for m in metode_list if m not in METODE]
+    if tidak_dikenal:
+        raise ValueError(f"Metode tidak dikenal: {', '.join(tidak_dikenal)}")
+    if not periode:
+        return {m: [] for m in metode_list}
+    
+    data = muat_data_mcdm(periode)
+    X = data['X']
+    if not X.size:
+        return {m: [] for m in metode_list}
+    
+    hasil = {}
+    for kode in metode_list:
+        skor = METODE[kode][1](X, data['bobot'], data['benefit'])
+        k = len(skor) if limit is None else offset + limit
+        urutan = indeks_teratas(skor, k)[offset:]
+        hasil[kode] = [
+            {
+                'produk_id': int(data['produk_ids'][i]),
+                'produk': data['produk_nama'][int(data['produk_ids'][i])],
+                'nilai': float(skor[i]),
+                'rank': offset + j + 1,
+                'periode': periode.nama,
+                'metode': kode,
+            }
+            for j, i in enumerate(urutan)
+        ]
+    return hasil
+
+
+def hitung_ranking_metode(periode, metode=METODE_DEFAULT, limit=None, offset=0):
+    return hitung_banyak_metode(periode, [metode], limit=limit, offset=offset)[metode]
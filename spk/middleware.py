@@ -0,0 +1,165 @@
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from .cache import mulai_memo_request, selesai_memo_request, memo_aktif, ambil_profil
+from .instrumentasi import mulai_catatan, selesai_catatan
+
+logger = logging.getLogger('spk.memo')
+timing_logger = logging.getLogger('spk.timing')
+
+
+class _SyncAsyncMiddleware:
+    """
+    Dasar middleware yang bisa jalan di WSGI maupun ASGI: kalau rantai
+    setelahnya async, __call__ mengembalikan coroutine __acall__ (seperti
+    MiddlewareMixin Django), jadi request ASGI tidak dipindah ke thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class MemoRequestMiddleware(_SyncAsyncMiddleware):
+    """
+    Pasang memo per request, supaya ranking/matriks periode yang sama
+    hanya dihitung sekali walaupun dipanggil dari beberapa view/analytics.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = mulai_memo_request()
+        request.memo = memo_aktif()
+        try:
+            response = self.get_response(request)
+        finally:
+            selesai_memo_request(token)
+        return self._selesai(request, response)
+
+    async def __acall__(self, request):
+        token = mulai_memo_request()
+        request.memo = memo_aktif()
+        try:
+            response = await self.get_response(request)
+        finally:
+            selesai_memo_request(token)
+        return self._selesai(request, response)
+
+    def _selesai(self, request, response):
+        memo = request.memo
+        logger.debug('%s memo hit=%d miss=%d', request.path, memo.hit, memo.miss)
+        if settings.DEBUG:
+            response['X-Memo-Request'] = f'hit={memo.hit}, miss={memo.miss}'
+        return response
+
+
+class ProfilMiddleware(_SyncAsyncMiddleware):
+    """
+    Pasang request.profile (UserProfile user yang login, atau None).
+    Profil dibaca dari session (lihat spk.cache.ambil_profil) dan baru
+    di-query ke DB saat session belum punya atau profilnya berubah.
+    Harus dipasang setelah AuthenticationMiddleware.
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.profile = ambil_profil(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.profile = await sync_to_async(ambil_profil)(request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware(_SyncAsyncMiddleware):
+    """
+    Catat jumlah query SQL, total waktu DB, waktu perhitungan TOPSIS dan
+    waktu render template tiap request, lalu kirim sebagai header Server-Timing.
+
+    Setting:
+    - SPK_TIMING_HEADER: True/False selalu/tidak pernah kirim header; None (default)
+      hanya saat DEBUG atau untuk user dengan role admin
+    - SPK_TIMING_LOG: tulis juga satu baris log JSON per request (logger spk.timing)
+    - SPK_TIMING_BATAS_MS: kalau request lebih lama dari ini, log query paling lambat
+    - SPK_TIMING_JUMLAH_QUERY_LAMBAT: berapa query lambat yang di-log
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.log = getattr(settings, 'SPK_TIMING_LOG', False)
+        self.batas_ms = getattr(settings, 'SPK_TIMING_BATAS_MS', None)
+        self.jumlah_query_lambat = getattr(settings, 'SPK_TIMING_JUMLAH_QUERY_LAMBAT', 5)
+
+    # query dicatat lewat execute_wrapper yang dipasang di tiap koneksi
+    # (spk.instrumentasi.pasang_pencatat_query), termasuk koneksi thread lain
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        catatan, token = mulai_catatan()
+        mulai = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            selesai_catatan(token)
+        return self._kirim(request, response, catatan, mulai)
+
+    async def __acall__(self, request):
+        catatan, token = mulai_catatan()
+        mulai = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            selesai_catatan(token)
+        return self._kirim(request, response, catatan, mulai)
+
+    def _kirim_header(self, request):
+        """Header membuka jumlah query & waktu internal, jadi tidak untuk semua client"""
+        header = getattr(settings, 'SPK_TIMING_HEADER', None)
+        if header is not None:
+            return header
+        # request.profile dipasang ProfilMiddleware (tanpa query tambahan)
+        profil = getattr(request, 'profile', None)
+        return settings.DEBUG or bool(profil and profil.is_admin())
+
+    def _kirim(self, request, response, catatan, mulai):
+        total_ms = (time.perf_counter() - mulai) * 1000
+        
+        metrik = {
+            'db': catatan.waktu_db * 1000,
+            'topsis': catatan.bagian.get('topsis', 0) * 1000,
+            'template': catatan.bagian.get('template', 0) * 1000,
+            'total': total_ms,
+        }
+        header = [f'db;desc="{catatan.jumlah_query} query";dur={metrik["db"]:.1f}']
+        header += [f'{nama};dur={metrik[nama]:.1f}' for nama in ('topsis', 'template', 'total')]
+        memo = getattr(request, 'memo', None)
+        if memo is not None:
+            header.append(f'memo;desc="hit={memo.hit} miss={memo.miss}"')
+        if self._kirim_header(request):
+            response['Server-Timing'] = ', '.join(header)
+        
+        if self.log:
+            timing_logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'query': catatan.jumlah_query,
+                **{f'{nama}_ms': round(nilai, 1) for nama, nilai in metrik.items()},
+            }))
+        if self.batas_ms is not None and total_ms > self.batas_ms:
+            timing_logger.warning(
+                '%s %s %.0f ms melewati batas %s ms (%d query, db %.0f ms). Query paling lambat:\n%s',
+                request.method, request.path, total_ms, self.batas_ms,
+                catatan.jumlah_query, metrik['db'],
+                '\n'.join(f'  {durasi * 1000:8.1f} ms  {sql}' for sql, durasi in
+                          catatan.query_terlambat(self.jumlah_query_lambat)),
+            )
+        return response
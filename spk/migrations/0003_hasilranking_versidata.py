@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spk', '0002_add_null_to_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersiData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kunci', models.CharField(max_length=50, unique=True)),
+                ('versi', models.PositiveIntegerField(default=0)),
+                ('diperbarui', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HasilRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nilai', models.FloatField()),
+                ('rank', models.PositiveIntegerField()),
+                ('versi', models.PositiveIntegerField(default=0)),
+                ('dihitung_pada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('periode', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hasil_ranking', to='spk.periode')),
+                ('produk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='spk.produk')),
+            ],
+            options={
+                'ordering': ['periode', 'rank'],
+                'indexes': [models.Index(fields=['periode', 'versi', 'rank'], name='spk_hasil_periode_rank_idx')],
+                'unique_together': {('periode', 'produk')},
+            },
+        ),
+    ]
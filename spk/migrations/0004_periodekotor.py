@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spk', '0003_hasilranking_versidata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodeKotor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ditandai_pertama', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ditandai_terakhir', models.DateTimeField(default=django.utils.timezone.now)),
+                ('periode', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='kotor', to='spk.periode')),
+            ],
+            options={
+                'verbose_name_plural': 'Periode kotor',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spk', '0004_periodekotor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nilaiproduk',
+            index=models.Index(fields=['periode', 'kriteria', 'produk', 'nilai'], name='spk_nilai_periode_krit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nilaiproduk',
+            index=models.Index(fields=['created_by', 'periode'], name='spk_nilai_user_periode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='periode',
+            index=models.Index(fields=['is_active', '-tanggal_mulai'], name='spk_periode_aktif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='periode',
+            index=models.Index(fields=['tanggal_mulai'], name='spk_periode_mulai_idx'),
+        ),
+    ]
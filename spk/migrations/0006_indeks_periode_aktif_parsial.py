@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spk', '0005_indeks_query'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='periode',
+            name='spk_periode_aktif_idx',
+        ),
+        migrations.AddIndex(
+            model_name='periode',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-tanggal_mulai'], name='spk_periode_aktif_idx'),
+        ),
+    ]
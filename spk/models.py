@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -47,6 +48,14 @@ class Periode(models.Model):
     #urutin periode terbaru
     class Meta:
         ordering = ['-tanggal_mulai']
+        indexes = [
+            # periode aktif terbaru (dipakai hampir di semua halaman); partial
+            # index karena filter is_active=True ditulis "WHERE is_active", yang
+            # tidak bisa dicari lewat index komposit (is_active, tanggal_mulai)
+            models.Index(fields=['-tanggal_mulai'], condition=models.Q(is_active=True), name='spk_periode_aktif_idx'),
+            # daftar periode & periode sebelumnya
+            models.Index(fields=['tanggal_mulai'], name='spk_periode_mulai_idx'),
+        ]
    #tampilin status dan nama perode
     def __str__(self):
         status = "(aktif)" if self.is_active else "(non-Aktif)"
@@ -59,64 +68,76 @@ class Periode(models.Model):
         return self.tanggal_mulai <= today <= self.tanggal_selesai
     #ambil data ranking
     def get_ranking_data(self):
-        from .utils import hitung_topsis
-        return hitung_topsis(self.id)
+        from .ranking import ambil_ranking
+        return ambil_ranking(self)
     #ambil periode sebelumnya
     def get_periode_sebelumnya(self):
         return Periode.objects.filter(
             tanggal_mulai__lt=self.tanggal_mulai
         ).order_by('-tanggal_mulai').first()
     
+# versi bulk get_avg_rating / get_sales_trend: satu-dua query untuk banyak produk
+class ProdukQuerySet(models.QuerySet):
+    def get_avg_ratings(self, periode=None):
+        """Rata-rata rating pelanggan (C3) per produk: {produk_id: rating}"""
+        from .cache import kriteria_id
+        produk_ids = list(self.values_list('pk', flat=True))
+        hasil = dict.fromkeys(produk_ids, 0)
+        rating_kriteria_id = kriteria_id('C3')
+        if rating_kriteria_id is None or not produk_ids:
+            return hasil
+        query = NilaiProduk.objects.filter(kriteria_id=rating_kriteria_id, produk_id__in=produk_ids)
+        if periode:
+            query = query.filter(periode=periode)
+        for produk_id, avg in query.values('produk_id').annotate(avg=models.Avg('nilai')).values_list('produk_id', 'avg'):
+            hasil[produk_id] = round(avg, 2) if avg else 0
+        return hasil
+    
+    def get_sales_trends(self, periode_count=4):
+        """Trend penjualan (C1) per produk: {produk_id: [{'periode', 'penjualan'}, ...]}"""
+        from .cache import kriteria_id
+        produk_ids = list(self.values_list('pk', flat=True))
+        sales_kriteria_id = kriteria_id('C1')  # Jumlah Penjualan
+        if sales_kriteria_id is None or not produk_ids:
+            return {produk_id: [] for produk_id in produk_ids}
+        periods = list(Periode.objects.order_by('-tanggal_mulai').values_list('id', 'nama')[:periode_count])
+        
+        nilai = {
+            (produk_id, periode_id): n
+            for produk_id, periode_id, n in NilaiProduk.objects.filter(
+                kriteria_id=sales_kriteria_id,
+                periode_id__in=[pid for pid, _ in periods],
+                produk_id__in=produk_ids,
+            ).values_list('produk_id', 'periode_id', 'nilai')
+        }
+        return {
+            produk_id: [
+                {'periode': nama, 'penjualan': nilai.get((produk_id, periode_id), 0)}
+                for periode_id, nama in periods
+            ]
+            for produk_id in produk_ids
+        }
+
     # produk (termasuk apa yang dinilai)
 class Produk(models.Model):
     nama = models.CharField(max_length=150)
     deskripsi = models.TextField(blank=True)
+    
+    objects = ProdukQuerySet.as_manager()
     #tampilin nama prduk
     def __str__(self):
         return self.nama
     #ambil kriteria dengan code c3 = RATING PELANGGAN
     def get_avg_rating(self, periode=None):
-        from .models import NilaiProduk, Kriteria
         try:
-            rating_kriteria = Kriteria.objects.get(kode='C3')  
-            query = NilaiProduk.objects.filter(
-                produk=self, 
-                kriteria=rating_kriteria
-            )
-            if periode:
-                query = query.filter(periode=periode)
-            #hitung rata" 
-            avg = query.aggregate(models.Avg('nilai'))['nilai__avg']
-            return round(avg, 2) if avg else 0
+            return Produk.objects.filter(pk=self.pk).get_avg_ratings(periode).get(self.pk, 0)
         except:
             return 0
     #Pakai metode ini untk mengambil tren penjualan bebrapa period
     def get_sales_trend(self, periode_count=4):
         """Trend penjualan produk dalam beberapa periode terakhir"""
-        from .models import NilaiProduk, Kriteria, Periode
         try:
-            sales_kriteria = Kriteria.objects.get(kode='C1')  # Jumlah Penjualan
-            periods = Periode.objects.all().order_by('-tanggal_mulai')[:periode_count]
-            
-            trend_data = []
-            for period in periods:
-                try:
-                    nilai = NilaiProduk.objects.get(
-                        produk=self,
-                        kriteria=sales_kriteria,
-                        periode=period
-                    ).nilai
-                    trend_data.append({
-                        'periode': period.nama,
-                        'penjualan': nilai
-                    })
-                except NilaiProduk.DoesNotExist:
-                    trend_data.append({
-                        'periode': period.nama,
-                        'penjualan': 0
-                    })
-            
-            return trend_data
+            return Produk.objects.filter(pk=self.pk).get_sales_trends(periode_count).get(self.pk, [])
         except:
             return []
 
@@ -149,7 +170,145 @@ class NilaiProduk(models.Model):
      #tdk ada yg boleh duplikat
     class Meta:
         unique_together = ('produk', 'kriteria', 'periode') 
+        indexes = [
+            # matriks keputusan per periode & agregat per (periode, kriteria);
+            # nilai ikut di index supaya query tidak perlu membaca tabel
+            models.Index(fields=['periode', 'kriteria', 'produk', 'nilai'], name='spk_nilai_periode_krit_idx'),
+            # data yang diinput user di suatu periode (halaman input nilai)
+            models.Index(fields=['created_by', 'periode'], name='spk_nilai_user_periode_idx'),
+        ]
     
     def __str__(self):
         return f"{self.produk.nama} - {self.kriteria.nama} ({self.periode.nama}): {self.nilai}"
     
+
+# versi data penilaian, dinaikkan oleh signal tiap kali data berubah
+class VersiData(models.Model):
+    kunci = models.CharField(max_length=50, unique=True)
+    versi = models.PositiveIntegerField(default=0)
+    diperbarui = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.kunci}: v{self.versi}"
+    
+    @staticmethod
+    def kunci_periode(periode_id):
+        return f'periode:{periode_id}'
+    
+    @classmethod
+    def naikkan(cls, kunci):
+        """Naikkan versi satu kunci (buat baris baru kalau belum ada)"""
+        from .cache import bersihkan_memo_request, bersihkan_referensi, KUNCI_REFERENSI
+        bersihkan_memo_request()
+        if kunci in KUNCI_REFERENSI:
+            bersihkan_referensi()
+        sekarang = timezone.now()
+        diubah = cls.objects.filter(kunci=kunci).update(
+            versi=models.F('versi') + 1, diperbarui=sekarang
+        )
+        if not diubah:
+            _, dibuat = cls.objects.get_or_create(
+                kunci=kunci, defaults={'versi': 1, 'diperbarui': sekarang}
+            )
+            if not dibuat:
+                cls.naikkan(kunci)
+    
+    @classmethod
+    def versi_periode_banyak(cls, periode_ids):
+        """Versi data ranking beberapa periode sekaligus: {periode_id: versi}"""
+        from .cache import memo_aktif, pastikan_versi_referensi
+        memo = memo_aktif()
+        hasil = {}
+        for pid in periode_ids:
+            ada, versi = memo.cari(('versi', pid)) if memo else (False, None)
+            hasil[pid] = versi if ada else None
+        sisa = [pid for pid, versi in hasil.items() if versi is None]
+        if not sisa:
+            return hasil
+        
+        kunci_map = {cls.kunci_periode(pid): pid for pid in sisa}
+        baris = dict(cls.objects.filter(
+            kunci__in=list(kunci_map) + ['kriteria', 'produk']
+        ).values_list('kunci', 'versi'))
+        # kriteria & produk berlaku untuk semua periode; cache referensi
+        # (bobot, daftar produk) disamakan dulu dengan versi yang dibaca ini
+        pastikan_versi_referensi({kunci: baris.get(kunci, 0) for kunci in ('kriteria', 'produk')})
+        dasar = baris.get('kriteria', 0) + baris.get('produk', 0)
+        for kunci, pid in kunci_map.items():
+            hasil[pid] = dasar + baris.get(kunci, 0)
+            if memo:
+                memo.simpan(('versi', pid), hasil[pid])
+        return hasil
+    
+    @classmethod
+    def versi_periode(cls, periode_id):
+        return cls.versi_periode_banyak([periode_id])[periode_id]
+
+# hasil ranking yang disimpan per periode, supaya tidak dihitung ulang tiap halaman
+class HasilRanking(models.Model):
+    periode = models.ForeignKey(Periode, on_delete=models.CASCADE, related_name='hasil_ranking')
+    produk = models.ForeignKey(Produk, on_delete=models.CASCADE)
+    nilai = models.FloatField()
+    rank = models.PositiveIntegerField()
+    versi = models.PositiveIntegerField(default=0)
+    dihitung_pada = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ('periode', 'produk')
+        ordering = ['periode', 'rank']
+        indexes = [
+            models.Index(fields=['periode', 'versi', 'rank'], name='spk_hasil_periode_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.rank} {self.produk.nama} ({self.periode.nama}): {self.nilai:.4f}"
+
+# antrian periode yang rankingnya perlu dihitung ulang oleh `manage.py ranking_worker`
+class PeriodeKotor(models.Model):
+    periode = models.OneToOneField(Periode, on_delete=models.CASCADE, related_name='kotor')
+    ditandai_pertama = models.DateTimeField(default=timezone.now)
+    ditandai_terakhir = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name_plural = 'Periode kotor'
+    
+    def __str__(self):
+        return f"{self.periode.nama} (sejak {self.ditandai_pertama:%d-%m-%Y %H:%M:%S})"
+    
+    @classmethod
+    def tandai(cls, periode_ids):
+        """
+        Masukkan periode ke antrian; yang sudah antri hanya diperbarui waktu
+        terakhirnya. Antrian hanya dipakai dengan SPK_RANKING_LATAR = True
+        (tanpa ranking_worker tidak ada yang mengosongkannya).
+        """
+        if not getattr(settings, 'SPK_RANKING_LATAR', False):
+            return
+        periode_ids = set(periode_ids)
+        if not periode_ids:
+            return
+        sekarang = timezone.now()
+        sudah = set(cls.objects.filter(periode_id__in=periode_ids).values_list('periode_id', flat=True))
+        if sudah:
+            cls.objects.filter(periode_id__in=sudah).update(ditandai_terakhir=sekarang)
+        cls.objects.bulk_create([
+            cls(periode_id=pid, ditandai_pertama=sekarang, ditandai_terakhir=sekarang)
+            for pid in periode_ids - sudah
+        ], ignore_conflicts=True)
+    
+    @classmethod
+    def tandai_semua(cls):
+        """Kriteria/produk berubah: semua periode perlu dihitung ulang"""
+        cls.tandai(Periode.objects.values_list('id', flat=True))
+    
+    @classmethod
+    def siap_dihitung(cls, jeda, maks_tunda):
+        """
+        Antrian yang sudah tenang selama `jeda` (tidak ada penulisan baru),
+        atau sudah menunggu lebih dari `maks_tunda` walaupun masih terus ditulis.
+        """
+        sekarang = timezone.now()
+        return cls.objects.filter(
+            models.Q(ditandai_terakhir__lte=sekarang - jeda)
+            | models.Q(ditandai_pertama__lte=sekarang - maks_tunda)
+        ).select_related('periode').order_by('ditandai_pertama')
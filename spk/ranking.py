@@ -0,0 +1,295 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Max
+from django.utils import timezone
+from .cache import memo_aktif, memo_request, produk_referensi
+from .models import HasilRanking, VersiData, PeriodeKotor
+from .tabel import TabelRanking
+from .utils import hitung_topsis_batch, posisi_id
+
+# jumlah periode yang dimuat & dihitung sekaligus saat menghitung ulang ranking
+PERIODE_PER_BATCH = 12
+
+
+def ambil_ranking(periode):
+    """
+    Ambil ranking TOPSIS satu periode dari tabel HasilRanking.
+    Hanya dihitung ulang (lalu disimpan) kalau versi data periode sudah berubah.
+    Return TabelRanking.
+    """
+    if not periode:
+        return TabelRanking()
+    return ambil_ranking_banyak([periode]).get(periode.id, TabelRanking())
+
+
+def ambil_halaman_ranking(periode, limit, offset=0):
+    """
+    Satu halaman ranking (rank offset+1 .. offset+limit) tanpa memuat semua
+    produk: dibaca dari HasilRanking lewat index (periode, versi, rank).
+    Return (TabelRanking, total_produk).
+    """
+    if not periode:
+        return TabelRanking(), 0
+    
+    # ranking lengkap yang sudah dimuat di request ini cukup diiris
+    versi = VersiData.versi_periode(periode.id)
+    memo = memo_aktif()
+    if memo:
+        ada, hasil = memo.cari(('ranking', periode.id, versi))
+        if ada and hasil:
+            return hasil[offset:offset + limit], len(hasil)
+    
+    tersimpan = HasilRanking.objects.filter(periode_id=periode.id)
+    segar = tersimpan.filter(versi=versi)
+    if not segar.exists():
+        if getattr(settings, 'SPK_RANKING_LATAR', False) and tersimpan.exists():
+            segar = tersimpan
+        else:
+            segarkan_ranking([periode])
+    
+    total = segar.count()
+    hasil = {periode.id: TabelRanking(periode.nama)}
+    _isi_hasil(hasil, segar, {periode.id: periode.nama}, offset, limit)
+    return hasil[periode.id], total
+
+
+def ambil_ranking_banyak(periode_list):
+    """
+    Ranking beberapa periode sekaligus: {periode_id: TabelRanking}.
+    Ranking tersimpan dibaca dengan satu query; periode yang basi dihitung
+    ulang bersama-sama dengan hitung_topsis_batch, per PERIODE_PER_BATCH periode.
+
+    Dengan SPK_RANKING_LATAR = True, periode yang basi langsung memakai
+    ranking terakhir yang sudah selesai (penghitungan ulang diserahkan ke
+    `manage.py ranking_worker`); hanya periode yang belum pernah punya
+    ranking yang dihitung di sini.
+    """
+    periode_list = [p for p in periode_list if p]
+    if not periode_list:
+        return {}
+    
+    versi = VersiData.versi_periode_banyak(p.id for p in periode_list)
+    nama_periode = {p.id: p.nama for p in periode_list}
+    hasil = {p.id: TabelRanking(p.nama) for p in periode_list}
+    
+    # periode yang sudah dihitung di request ini tidak perlu dibaca lagi
+    memo = memo_aktif()
+    if memo:
+        for periode_id, v in versi.items():
+            ada, tersimpan = memo.cari(('ranking', periode_id, v))
+            if ada:
+                hasil[periode_id] = tersimpan
+    dibaca = {pid: v for pid, v in versi.items() if not hasil[pid]}
+    
+    _isi_hasil(hasil, HasilRanking.objects.filter(_filter_versi(dibaca)), nama_periode)
+    
+    basi = [p for p in periode_list if not hasil[p.id]]
+    if basi and getattr(settings, 'SPK_RANKING_LATAR', False):
+        _isi_hasil(hasil, HasilRanking.objects.filter(periode_id__in=[p.id for p in basi]), nama_periode)
+    
+    basi = [p for p in periode_list if not hasil[p.id]]
+    hasil.update(_hitung_dan_simpan(basi, versi))
+    
+    if memo:
+        for periode_id in dibaca:
+            memo.simpan(('ranking', periode_id, versi[periode_id]), hasil[periode_id])
+    return hasil
+
+
+def _isi_hasil(hasil, queryset, nama_periode, offset=0, limit=None):
+    """Isi {periode_id: TabelRanking} dengan baris HasilRanking dari queryset"""
+    baris = queryset.order_by('periode_id', 'rank').values_list(
+        'periode_id', 'produk_id', 'produk__nama', 'nilai', 'rank'
+    )
+    if limit is not None:
+        baris = baris[offset:offset + limit]
+    baris = list(baris)
+    if not baris:
+        return
+    periode_ids, produk_ids, nama, nilai, rank = zip(*baris)
+    # baris sudah urut periode: potong per periode
+    periode_ids = np.array(periode_ids)
+    batas = np.flatnonzero(np.diff(periode_ids)) + 1
+    for awal, akhir in zip(np.r_[0, batas].tolist(), np.r_[batas, len(baris)].tolist()):
+        periode_id = int(periode_ids[awal])
+        hasil[periode_id] = TabelRanking(
+            nama_periode[periode_id], produk_ids[awal:akhir], nama[awal:akhir],
+            nilai[awal:akhir], rank[awal:akhir],
+        )
+
+
+def status_ranking(periode):
+    """
+    Kapan ranking tersimpan suatu periode terakhir dihitung, apakah sudah
+    basi terhadap data terbaru, dan apakah sedang menunggu di antrian worker.
+    """
+    if not periode:
+        return None
+    tersimpan = HasilRanking.objects.filter(periode_id=periode.id).aggregate(
+        dihitung_pada=Max('dihitung_pada'), versi=Max('versi')
+    )
+    return {
+        'dihitung_pada': tersimpan['dihitung_pada'],
+        'basi': tersimpan['versi'] != VersiData.versi_periode(periode.id),
+        'antri': PeriodeKotor.objects.filter(periode_id=periode.id).exists(),
+    }
+
+
+def proses_antrian(jeda, maks_tunda, ukuran_batch=12):
+    """
+    Satu putaran worker: hitung ulang periode kotor yang sudah siap (lihat
+    PeriodeKotor.siap_dihitung) dalam satu batch, lalu keluarkan dari antrian.
+    Periode yang ditandai lagi selama penghitungan tetap di antrian.
+    Return list periode yang diproses.
+    """
+    antrian = list(PeriodeKotor.siap_dihitung(jeda, maks_tunda)[:ukuran_batch])
+    if not antrian:
+        return []
+    segarkan_ranking([k.periode for k in antrian], latar=False)
+    
+    selesai = Q(pk__in=[])
+    for k in antrian:
+        selesai |= Q(pk=k.pk, ditandai_terakhir=k.ditandai_terakhir)
+    PeriodeKotor.objects.filter(selesai).delete()
+    return [k.periode for k in antrian]
+
+
+def periode_basi(periode_list):
+    """Periode yang ranking tersimpannya tidak sesuai versi data terbaru"""
+    versi = VersiData.versi_periode_banyak(p.id for p in periode_list)
+    segar = set(HasilRanking.objects.filter(_filter_versi(versi)).values_list(
+        'periode_id', flat=True
+    ).distinct())
+    return [p for p in periode_list if p.id not in segar]
+
+
+def segarkan_ranking(periode_list, latar=None):
+    """
+    Pastikan semua periode punya HasilRanking untuk dibaca (periode yang
+    basi dihitung ulang per PERIODE_PER_BATCH periode). Return {periode_id: versi baris
+    HasilRanking yang harus dibaca}.
+
+    Dengan SPK_RANKING_LATAR = True (latar=None mengikuti setting), periode
+    basi yang sudah punya ranking tidak dihitung: yang dikembalikan versi
+    ranking terakhir yang selesai, dan penghitungan ulang diserahkan ke
+    ranking_worker (yang memanggil fungsi ini dengan latar=False).
+    """
+    periode_list = [p for p in periode_list if p]
+    if not periode_list:
+        return {}
+    if latar is None:
+        latar = getattr(settings, 'SPK_RANKING_LATAR', False)
+    
+    versi = VersiData.versi_periode_banyak(p.id for p in periode_list)
+    # HasilRanking satu periode selalu diganti sekaligus, jadi hanya ada satu versi
+    tersimpan = dict(HasilRanking.objects.filter(periode_id__in=list(versi)).values(
+        'periode_id'
+    ).annotate(versi=Max('versi')).values_list('periode_id', 'versi'))
+    basi = [p for p in periode_list if tersimpan.get(p.id) != versi[p.id]]
+    if latar:
+        for periode in [p for p in basi if p.id in tersimpan]:
+            versi[periode.id] = tersimpan[periode.id]
+            basi.remove(periode)
+    _hitung_dan_simpan(basi, versi)
+    return versi
+
+
+def _hitung_dan_simpan(periode_list, versi):
+    """
+    Hitung ranking periode_list dengan hitung_topsis_batch per
+    PERIODE_PER_BATCH periode (memori tensor tetap kecil walaupun semua
+    periode basi), lalu simpan dengan versi[periode_id].
+    Return {periode_id: TabelRanking}.
+    """
+    hasil = {}
+    for awal in range(0, len(periode_list), PERIODE_PER_BATCH):
+        batch_periode = periode_list[awal:awal + PERIODE_PER_BATCH]
+        batch = hitung_topsis_batch([p.id for p in batch_periode])
+        if not batch:
+            continue
+        produk_nama = produk_referensi()['nama']
+        for i, periode in enumerate(batch_periode):
+            hasil[periode.id] = hasil_dari_array(
+                periode, batch['produk_ids'], produk_nama,
+                batch['nilai'][i], batch['rank'][i],
+            )
+            simpan_ranking(periode, hasil[periode.id], versi[periode.id])
+    return hasil
+
+
+def ambil_riwayat_ranking(periode_list):
+    """
+    Riwayat rank & nilai semua produk di beberapa periode, sebagai array.
+    Mengembalikan dict: periode (list, urut tanggal), produk_ids, produk (nama),
+    rank dan nilai berbentuk (periode x produk); NaN = produk belum punya ranking.
+    """
+    periode_list = sorted({p.id: p for p in periode_list if p}.values(), key=lambda p: p.tanggal_mulai)
+    versi = VersiData.versi_periode_banyak(p.id for p in periode_list)
+    kunci = ('riwayat', tuple((p.id, versi[p.id]) for p in periode_list))
+    return memo_request(kunci, lambda: _muat_riwayat_ranking(periode_list))
+
+
+def _muat_riwayat_ranking(periode_list):
+    versi = segarkan_ranking(periode_list)
+    
+    baris = np.array(list(
+        HasilRanking.objects.filter(_filter_versi(versi)).values_list(
+            'periode_id', 'produk_id', 'nilai', 'rank'
+        )
+    ), dtype=float).reshape(-1, 4)
+    
+    periode_ids = np.array([p.id for p in periode_list], dtype=np.int64)
+    produk_ids = np.unique(baris[:, 1].astype(np.int64))
+    rank = np.full((len(periode_ids), len(produk_ids)), np.nan)
+    nilai = np.full((len(periode_ids), len(produk_ids)), np.nan)
+    if len(baris):
+        i, _ = posisi_id(periode_ids, baris[:, 0].astype(np.int64))
+        j, _ = posisi_id(produk_ids, baris[:, 1].astype(np.int64))
+        rank[i, j] = baris[:, 3]
+        nilai[i, j] = baris[:, 2]
+    
+    # array dibagi lewat memo request, jadi dikunci dari perubahan
+    rank.flags.writeable = False
+    nilai.flags.writeable = False
+    produk_nama = produk_referensi()['nama']
+    return {
+        'periode': periode_list,
+        'produk_ids': produk_ids,
+        'produk': [produk_nama.get(pid, '') for pid in produk_ids.tolist()],
+        'rank': rank,
+        'nilai': nilai,
+    }
+
+
+def _filter_versi(versi):
+    """Q untuk baris HasilRanking yang versinya cocok dengan {periode_id: versi}"""
+    segar = Q(pk__in=[])
+    for periode_id, v in versi.items():
+        segar |= Q(periode_id=periode_id, versi=v)
+    return segar
+
+
+def hasil_dari_array(periode, produk_ids, produk_nama, nilai, rank):
+    """Ubah array hasil kernel jadi TabelRanking, urut per rank"""
+    return TabelRanking.dari_array(periode.nama, produk_ids, produk_nama, nilai, rank)
+
+
+def simpan_ranking(periode, hasil, versi):
+    """Ganti ranking tersimpan satu periode dengan hasil baru"""
+    dihitung_pada = timezone.now()
+    with transaction.atomic():
+        HasilRanking.objects.filter(periode_id=periode.id).delete()
+        HasilRanking.objects.bulk_create([
+            HasilRanking(
+                periode_id=periode.id,
+                produk_id=produk_id,
+                nilai=nilai,
+                rank=rank,
+                versi=versi,
+                dihitung_pada=dihitung_pada,
+            )
+            for produk_id, nilai, rank in zip(
+                hasil.produk_ids.tolist(), hasil.nilai.tolist(), hasil.rank.tolist()
+            )
+        ], batch_size=1000)
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .cache import naikkan_versi_profil
+from .models import UserProfile, NilaiProduk, Kriteria, Produk, Periode, VersiData, PeriodeKotor
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -25,3 +26,30 @@ def save_user_profile(sender, instance, created, **kwargs):
         except Exception as e:
             # Log error tapi jangan crash
             print(f"Error creating UserProfile for {instance.username}: {e}")
+
+# setiap perubahan data penilaian menaikkan versi, sehingga HasilRanking yang lama dianggap basi,
+# dan periodenya masuk antrian ranking_worker
+@receiver([post_save, post_delete], sender=NilaiProduk)
+def invalidasi_ranking_nilai(sender, instance, **kwargs):
+    VersiData.naikkan(VersiData.kunci_periode(instance.periode_id))
+    PeriodeKotor.tandai([instance.periode_id])
+
+@receiver([post_save, post_delete], sender=Kriteria)
+def invalidasi_ranking_kriteria(sender, instance, **kwargs):
+    VersiData.naikkan('kriteria')
+    PeriodeKotor.tandai_semua()
+
+@receiver([post_save, post_delete], sender=Produk)
+def invalidasi_ranking_produk(sender, instance, **kwargs):
+    VersiData.naikkan('produk')
+    PeriodeKotor.tandai_semua()
+
+# periode tidak mengubah ranking, tapi cache periode aktif perlu dimuat ulang
+@receiver([post_save, post_delete], sender=Periode)
+def invalidasi_referensi_periode(sender, instance, **kwargs):
+    VersiData.naikkan('periode')
+
+# role/profil yang tersimpan di session user dimuat ulang
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidasi_profil_session(sender, instance, **kwargs):
+    naikkan_versi_profil()
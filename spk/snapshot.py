@@ -0,0 +1,145 @@
+"""
+Snapshot matriks keputusan per periode untuk analisis offline
+(`manage.py snapshot_matrices`). Tiap periode ditulis ke satu folder:
+
+    <MEDIA_ROOT>/snapshot/periode_<id>/
+        matriks.npy     matriks keputusan (produk x kriteria), float64
+        produk_ids.npy  id produk per baris matriks
+        meta.npz        nama produk, id/kode kriteria, bobot, benefit,
+                        nama & tanggal periode, versi data
+
+buka_snapshot membuka .npy dengan mmap_mode, jadi perhitungan (misalnya
+hitung_topsis_snapshot) jalan tanpa DB dan tanpa menyalin matriks ke memori.
+"""
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from .cache import kriteria_referensi, produk_referensi
+from .models import VersiData
+from .tabel import TabelRanking
+from .utils import muat_tensor_keputusan, hitung_preferensi_topsis, indeks_teratas
+
+
+def direktori_snapshot(direktori=None):
+    if direktori:
+        return Path(direktori)
+    return Path(getattr(settings, 'SPK_SNAPSHOT_DIR', Path(settings.MEDIA_ROOT) / 'snapshot'))
+
+
+def folder_periode(periode_id, direktori=None):
+    return direktori_snapshot(direktori) / f'periode_{periode_id}'
+
+
+def _tulis_atomik(path, tulis):
+    """Tulis ke file sementara di folder yang sama lalu ganti sekaligus"""
+    fd, sementara = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as berkas:
+            tulis(berkas)
+        os.replace(sementara, path)
+    except BaseException:
+        os.unlink(sementara)
+        raise
+
+
+def versi_snapshot(periode_id, direktori=None):
+    """Versi data snapshot yang tersimpan (None kalau belum ada)"""
+    path = folder_periode(periode_id, direktori) / 'meta.npz'
+    if not path.exists():
+        return None
+    with np.load(path) as meta:
+        return int(meta['versi'])
+
+
+def tulis_snapshot(periode_list, direktori=None, ukuran_batch=12, paksa=False):
+    """
+    Tulis snapshot periode-periode ini. Data dimuat per batch (satu query
+    per batch); periode yang snapshot-nya sudah sesuai versi data terbaru
+    dilewati kecuali paksa=True. Generator: yield (periode, status).
+    """
+    periode_list = [p for p in periode_list if p]
+    # versi dibaca sebelum referensi (lihat VersiData.versi_periode_banyak)
+    versi = VersiData.versi_periode_banyak(p.id for p in periode_list)
+    kriteria = kriteria_referensi()
+    produk = produk_referensi()
+    nama_produk = np.array([produk['nama'][pid] for pid in produk['ids']], dtype=str)
+
+    for awal in range(0, len(periode_list), ukuran_batch):
+        batch = periode_list[awal:awal + ukuran_batch]
+        if not paksa:
+            for periode in [p for p in batch if versi_snapshot(p.id, direktori) == versi[p.id]]:
+                batch.remove(periode)
+                yield periode, 'lewat'
+        if not batch:
+            continue
+
+        T, _, produk_ids, kriteria_ids = muat_tensor_keputusan(
+            [p.id for p in batch], produk_ids=produk['ids'], kriteria_ids=kriteria['ids'],
+        )
+        for i, periode in enumerate(batch):
+            folder = folder_periode(periode.id, direktori)
+            folder.mkdir(parents=True, exist_ok=True)
+            # meta lama dihapus dulu: kalau penulisan terhenti di tengah, folder
+            # dianggap belum lengkap, bukan meta lama yang menempel di matriks baru
+            (folder / 'meta.npz').unlink(missing_ok=True)
+            _tulis_atomik(folder / 'matriks.npy', lambda f: np.save(f, T[i]))
+            _tulis_atomik(folder / 'produk_ids.npy', lambda f: np.save(f, produk_ids))
+            # meta ditulis terakhir: versinya menandai snapshot sudah lengkap
+            _tulis_atomik(folder / 'meta.npz', lambda f: np.savez(
+                f,
+                produk=nama_produk,
+                kriteria_ids=kriteria_ids,
+                kode=np.array(kriteria['kode'], dtype=str),
+                bobot=np.asarray(kriteria['bobot'], dtype=float),
+                benefit=np.asarray(kriteria['benefit'], dtype=bool),
+                periode=np.array(periode.nama),
+                tanggal_mulai=np.array(periode.tanggal_mulai.isoformat()),
+                tanggal_selesai=np.array(periode.tanggal_selesai.isoformat()),
+                versi=np.array(versi[periode.id]),
+            ))
+            yield periode, 'ditulis'
+
+
+def daftar_snapshot(direktori=None):
+    """Id periode yang punya snapshot lengkap, urut id"""
+    folder = direktori_snapshot(direktori)
+    if not folder.exists():
+        return []
+    return sorted(
+        int(sub.name.split('_', 1)[1]) for sub in folder.glob('periode_*')
+        if (sub / 'meta.npz').exists()
+    )
+
+
+def buka_snapshot(periode_id, direktori=None, mmap_mode='r'):
+    """
+    Buka snapshot satu periode tanpa DB. X dan produk_ids berupa memmap
+    (read-only); kunci lain mengikuti muat_data_mcdm, jadi kernel METODE
+    bisa langsung dipakai: METODE[kode][1](s['X'], s['bobot'], s['benefit']).
+    """
+    folder = folder_periode(periode_id, direktori)
+    if not (folder / 'meta.npz').exists():
+        raise FileNotFoundError(f'Snapshot periode {periode_id} tidak ada di {folder}')
+    with np.load(folder / 'meta.npz') as meta:
+        data = {kunci: meta[kunci] for kunci in meta.files}
+    for kunci in ('periode', 'tanggal_mulai', 'tanggal_selesai', 'versi'):
+        data[kunci] = data[kunci].item()
+    data['X'] = np.load(folder / 'matriks.npy', mmap_mode=mmap_mode)
+    data['produk_ids'] = np.load(folder / 'produk_ids.npy', mmap_mode=mmap_mode)
+    return data
+
+
+def hitung_topsis_snapshot(snapshot, limit=None, offset=0):
+    """hitung_topsis versi snapshot (hasil buka_snapshot): return TabelRanking"""
+    nilai = hitung_preferensi_topsis(snapshot['X'], snapshot['bobot'], snapshot['benefit'])
+    k = len(nilai) if limit is None else offset + limit
+    urutan = indeks_teratas(nilai, k)[offset:]
+    return TabelRanking(
+        snapshot['periode'],
+        snapshot['produk_ids'][urutan],
+        snapshot['produk'][urutan].tolist(),
+        nilai[urutan],
+        np.arange(offset + 1, offset + len(urutan) + 1),
+    )
@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import math
+import numpy as np
+
+KOLOM = ['produk_id', 'produk', 'nilai', 'rank', 'periode']
+
+_encode_str = json.encoder.encode_basestring_ascii
+
+
+def _angka_json(x):
+    """Float ke teks JSON, sama dengan json.dumps (NaN/Infinity ikut)"""
+    return repr(x) if math.isfinite(x) else json.dumps(x)
+
+
+class TabelRanking:
+    """
+    Hasil ranking satu periode dalam bentuk kolom: produk_ids, produk (nama),
+    nilai dan rank sebagai array sejajar, urut rank. Nama periode hanya
+    disimpan sekali.
+
+    Iterasi / indeks menghasilkan dict per baris (format lama hitung_topsis),
+    jadi template dan kode lama tetap jalan; slicing menghasilkan TabelRanking
+    lagi tanpa menyalin array, dan ke_json / ke_csv langsung dari kolom.
+    """
+
+    def __init__(self, periode='', produk_ids=(), produk=(), nilai=(), rank=()):
+        self.periode = periode
+        self.produk_ids = np.asarray(produk_ids, dtype=np.int64)
+        self.produk = list(produk)
+        self.nilai = np.asarray(nilai, dtype=float)
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self._posisi = None
+
+    @classmethod
+    def dari_array(cls, periode, produk_ids, produk_nama, nilai, rank):
+        """Dari array hasil kernel (urutan produk bebas): diurutkan per rank"""
+        urutan = np.argsort(rank, kind='stable')
+        produk_ids = np.asarray(produk_ids)[urutan]
+        return cls(
+            periode,
+            produk_ids,
+            [produk_nama.get(pid, '') for pid in produk_ids.tolist()],
+            np.asarray(nilai)[urutan],
+            np.asarray(rank)[urutan],
+        )
+
+    def __len__(self):
+        return len(self.produk_ids)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def baris(self, i):
+        return {
+            'produk_id': int(self.produk_ids[i]),
+            'produk': self.produk[i],
+            'nilai': float(self.nilai[i]),
+            'rank': int(self.rank[i]),
+            'periode': self.periode,
+        }
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return TabelRanking(
+                self.periode, self.produk_ids[i], self.produk[i], self.nilai[i], self.rank[i]
+            )
+        return self.baris(range(len(self))[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.baris(i)
+
+    def __eq__(self, lain):
+        # sama dengan TabelRanking lain atau list dict format lama
+        if isinstance(lain, TabelRanking):
+            lain = lain.ke_list()
+        if not isinstance(lain, list):
+            return NotImplemented
+        return self.ke_list() == lain
+
+    def __repr__(self):
+        return f'<TabelRanking {self.periode!r}: {len(self)} produk>'
+
+    def posisi(self, produk_id):
+        """Indeks baris produk (None kalau tidak ada)"""
+        if self._posisi is None:
+            self._posisi = {pid: i for i, pid in enumerate(self.produk_ids.tolist())}
+        return self._posisi.get(produk_id)
+
+    def cari(self, produk_id):
+        """Baris satu produk sebagai dict (None kalau tidak ada)"""
+        i = self.posisi(produk_id)
+        return None if i is None else self.baris(i)
+
+    def ke_list(self):
+        return list(self)
+
+    def ke_json(self):
+        """Teks JSON list baris, sama dengan json.dumps(self.ke_list())"""
+        periode = _encode_str(self.periode)
+        return '[' + ', '.join(
+            f'{{"produk_id": {pid}, "produk": {_encode_str(nama)}, "nilai": {_angka_json(nilai)}, '
+            f'"rank": {rank}, "periode": {periode}}}'
+            for pid, nama, nilai, rank in zip(
+                self.produk_ids.tolist(), self.produk, self.nilai.tolist(), self.rank.tolist()
+            )
+        ) + ']'
+
+    def ke_csv(self, berkas=None, header=True):
+        """Tulis CSV (kolom KOLOM) ke berkas; tanpa berkas, return teksnya"""
+        teks = berkas is None
+        if teks:
+            berkas = io.StringIO()
+        writer = csv.writer(berkas)
+        if header:
+            writer.writerow(KOLOM)
+        writer.writerows(zip(
+            self.produk_ids.tolist(), self.produk, self.nilai.tolist(),
+            self.rank.tolist(), [self.periode] * len(self),
+        ))
+        return berkas.getvalue() if teks else None
@@ -1,3 +1,952 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import json
+import tempfile
+from contextlib import redirect_stdout
+import numpy as np
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import HasilRanking, Produk, Kriteria, NilaiProduk, Periode, PeriodeKotor, UserProfile, VersiData
+from .backfill import backfill_ranking
+from .ekspor import KOLOM_NILAI, KOLOM_RANKING, baris_nilai, baris_ranking
+from .inkremental import StatistikTopsis, _statistik, perbarui_ranking_inkremental
+from .importer import impor_nilai_csv
+from .mcdm import hitung_banyak_metode, saw, wp
+from . import cache as spk_cache
+from . import utils as spk_utils
+from .api import _di_thread
+from .cache import ambil_periode_aktif, kriteria_referensi, memo_aktif, mulai_memo_request, selesai_memo_request
+from .instrumentasi import catatan_aktif, mulai_catatan, selesai_catatan, ukur_bagian
+from .analytics import get_sales_analytics, get_kriteria_analysis, get_sensitivitas_bobot
+from .ranking import ambil_halaman_ranking, ambil_ranking, periode_basi, proses_antrian, segarkan_ranking
+from .snapshot import tulis_snapshot, buka_snapshot, daftar_snapshot, hitung_topsis_snapshot, versi_snapshot
+from .tabel import TabelRanking
+from .utils import muat_matriks_keputusan, hitung_topsis, hitung_topsis_batch
 
-# Create your tests here.
+
+def rencana_query(fungsi):
+    """Jalankan fungsi, lalu EXPLAIN QUERY PLAN tiap SELECT yang dieksekusinya"""
+    with CaptureQueriesContext(connection) as ctx:
+        fungsi()
+    hasil = []
+    for query in ctx.captured_queries:
+        if not query['sql'].startswith('SELECT'):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+            hasil.append((query['sql'], [baris[3] for baris in cursor.fetchall()]))
+    return hasil
+
+
+class CacheProsesMixin:
+    """
+    Cache per proses (referensi kriteria/produk/periode dan statistik
+    inkremental) tidak ikut di-rollback, padahal id & versi data test
+    bisa berulang: dikosongkan sebelum dan sesudah tiap test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.bersihkan_cache_proses()
+        self.addCleanup(self.bersihkan_cache_proses)
+
+    @staticmethod
+    def bersihkan_cache_proses():
+        spk_cache._referensi.clear()
+        spk_cache._versi_referensi.update(dicek=None, versi={})
+        _statistik.clear()
+
+
+class DataSpkTestCase(CacheProsesMixin, TestCase):
+    """3 kriteria (C1-C3), 5 produk, 3 periode (periode terakhir aktif)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create melewati signal pembuat UserProfile (tidak dibutuhkan di sini)
+        cls.user = User.objects.bulk_create([User(username='staff')])[0]
+        cls.kriteria = [
+            Kriteria.objects.create(kode=f'C{i}', nama=f'Kriteria {i}', bobot=i, sifat='benefit')
+            for i in range(1, 4)
+        ]
+        cls.produk = [Produk.objects.create(nama=f'Produk {i}') for i in range(5)]
+        cls.periode = [
+            Periode.objects.create(
+                nama=f'Periode {i}',
+                tanggal_mulai=datetime.date(2024, 1, 1) + datetime.timedelta(days=30 * i),
+                tanggal_selesai=datetime.date(2024, 1, 29) + datetime.timedelta(days=30 * i),
+                is_active=(i == 2),
+            )
+            for i in range(3)
+        ]
+        NilaiProduk.objects.bulk_create([
+            NilaiProduk(produk=p, kriteria=k, periode=per, nilai=10 + i, created_by=cls.user)
+            for per in cls.periode
+            for i, p in enumerate(cls.produk)
+            for k in cls.kriteria
+        ])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'rencana query dicek dengan EXPLAIN QUERY PLAN SQLite')
+class IndexQueryTest(DataSpkTestCase):
+    """Query dashboard & ranking harus memakai index, bukan scan tabel"""
+
+    def rencana_tabel(self, fungsi, tabel):
+        """Rencana query yang membaca `tabel`; gagal kalau fungsi tidak menyentuhnya"""
+        rencana = [baris for sql, baris in rencana_query(fungsi) if f'"{tabel}"' in sql]
+        self.assertTrue(rencana, f'tidak ada query ke {tabel}')
+        return rencana
+
+    def assertPakaiIndex(self, rencana, tabel, index, boleh_scan_index=False):
+        """Tidak ada scan tabel penuh (scan berurutan lewat index boleh kalau diizinkan)"""
+        for baris in rencana:
+            for langkah in baris:
+                if langkah.startswith(f'SCAN {tabel}'):
+                    self.assertTrue(boleh_scan_index and ' USING ' in langkah, baris)
+        self.assertTrue(
+            any(index in langkah for baris in rencana for langkah in baris),
+            f'{index} tidak dipakai: {rencana}',
+        )
+
+    def test_matriks_keputusan_pakai_covering_index(self):
+        rencana = self.rencana_tabel(lambda: muat_matriks_keputusan(self.periode[2].id), 'spk_nilaiproduk')
+        self.assertPakaiIndex(rencana, 'spk_nilaiproduk', 'COVERING INDEX spk_nilai_periode_krit_idx')
+
+    def test_analisis_kriteria_pakai_index_periode_kriteria(self):
+        rencana = self.rencana_tabel(lambda: get_kriteria_analysis(self.periode[2]), 'spk_nilaiproduk')
+        self.assertPakaiIndex(rencana, 'spk_nilaiproduk', 'spk_nilai_periode_krit_idx')
+
+    def test_trend_penjualan_pakai_index_periode_kriteria(self):
+        rencana = self.rencana_tabel(get_sales_analytics, 'spk_nilaiproduk')
+        self.assertPakaiIndex(rencana, 'spk_nilaiproduk', 'spk_nilai_periode_krit_idx')
+
+    def test_nilai_input_user_pakai_index_user_periode(self):
+        query = NilaiProduk.objects.filter(created_by=self.user, periode=self.periode[2])
+        rencana = self.rencana_tabel(lambda: list(query), 'spk_nilaiproduk')
+        self.assertPakaiIndex(rencana, 'spk_nilaiproduk', 'spk_nilai_user_periode_idx')
+
+    def test_halaman_ranking_pakai_index_hasil(self):
+        ambil_halaman_ranking(self.periode[2], 3)
+        rencana = self.rencana_tabel(lambda: ambil_halaman_ranking(self.periode[2], 3, 1), 'spk_hasilranking')
+        self.assertPakaiIndex(rencana, 'spk_hasilranking', 'spk_hasil_periode_rank_idx')
+
+    def test_periode_aktif_tanpa_sort_sementara(self):
+        rencana = self.rencana_tabel(
+            lambda: Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first(),
+            'spk_periode',
+        )
+        self.assertPakaiIndex(rencana, 'spk_periode', 'spk_periode_aktif_idx', boleh_scan_index=True)
+        self.assertNotIn('USE TEMP B-TREE', str(rencana))
+
+    def test_periode_sebelumnya_pakai_index_tanggal(self):
+        rencana = self.rencana_tabel(self.periode[2].get_periode_sebelumnya, 'spk_periode')
+        self.assertPakaiIndex(rencana, 'spk_periode', 'SEARCH spk_periode USING INDEX spk_periode_mulai_idx')
+
+
+class ProdukBulkTest(DataSpkTestCase):
+    """Rating & trend penjualan banyak produk tanpa query per produk/periode"""
+
+    def query_nilai(self, fungsi):
+        with CaptureQueriesContext(connection) as ctx:
+            hasil = fungsi()
+        return hasil, [q for q in ctx.captured_queries if '"spk_nilaiproduk"' in q['sql']]
+
+    def test_rating_banyak_produk_satu_query(self):
+        ratings, query = self.query_nilai(lambda: Produk.objects.get_avg_ratings(self.periode[2]))
+        self.assertEqual(len(query), 1)
+        self.assertEqual(ratings, {p.id: 10.0 + i for i, p in enumerate(self.produk)})
+        self.assertEqual(self.produk[3].get_avg_rating(self.periode[2]), ratings[self.produk[3].id])
+
+    def test_trend_banyak_produk_satu_query(self):
+        NilaiProduk.objects.filter(produk=self.produk[0], periode=self.periode[1]).delete()
+        trends, query = self.query_nilai(lambda: Produk.objects.get_sales_trends(periode_count=2))
+        self.assertEqual(len(query), 1)
+        self.assertEqual(trends[self.produk[0].id], [
+            {'periode': 'Periode 2', 'penjualan': 10.0},
+            {'periode': 'Periode 1', 'penjualan': 0},
+        ])
+        self.assertEqual(self.produk[4].get_sales_trend(2), trends[self.produk[4].id])
+
+
+class SensitivitasBobotTest(DataSpkTestCase):
+    """Monte Carlo bobot: rank seri stabil dan hasil tidak bergantung ukuran blok"""
+
+    def setUp(self):
+        super().setUp()
+        # produk 3 & 4 seri di semua kriteria
+        NilaiProduk.objects.filter(produk=self.produk[4]).update(nilai=13)
+
+    def test_tanpa_sebaran_rank_selalu_tetap(self):
+        hasil = get_sensitivitas_bobot(self.periode[2], n_sampel=50, sebaran=0, seed=1)
+        self.assertEqual([p['rank_dasar'] for p in hasil['produk']], [1, 2, 3, 4, 5])
+        self.assertEqual([p['prob_tetap'] for p in hasil['produk']], [1.0] * 5)
+
+    def test_hasil_sama_walaupun_dipecah_per_blok(self):
+        utuh = get_sensitivitas_bobot(self.periode[2], n_sampel=40, sebaran=0.5, seed=7)
+        with mock.patch('spk.analytics.BATAS_SEL_SENSITIVITAS', 15):
+            per_blok = get_sensitivitas_bobot(self.periode[2], n_sampel=40, sebaran=0.5, seed=7)
+        self.assertEqual(per_blok['produk'], utuh['produk'])
+
+
+class SalesAnalyticsTest(DataSpkTestCase):
+    """Chart penjualan (C1): jendela periode_count periode terakhir, top-N dipilih di jendela itu"""
+
+    def setUp(self):
+        super().setUp()
+        c1 = self.kriteria[0]
+        # produk 0 paling laku, tapi hanya di periode 0 (di luar jendela 2 periode)
+        NilaiProduk.objects.filter(kriteria=c1, periode=self.periode[0], produk=self.produk[0]).update(nilai=1000)
+        NilaiProduk.objects.filter(kriteria=c1, periode=self.periode[1], produk=self.produk[1]).update(nilai=100)
+
+    def test_top_n_dari_jendela_chart(self):
+        data = get_sales_analytics(periode_count=2, top_n=2)
+        self.assertEqual(data['labels'], ['Periode 1', 'Periode 2'])
+        self.assertEqual(
+            [(d['label'], d['data']) for d in data['datasets']],
+            [('Produk 1', [100.0, 11.0]), ('Produk 4', [14.0, 14.0])],
+        )
+
+    def test_semua_periode(self):
+        data = get_sales_analytics(periode_count=10, top_n=1)
+        self.assertEqual(data['labels'], ['Periode 0', 'Periode 1', 'Periode 2'])
+        self.assertEqual([(d['label'], d['data']) for d in data['datasets']], [('Produk 0', [1000.0, 10.0, 10.0])])
+
+
+class KriteriaAnalysisTest(CacheProsesMixin, TestCase):
+    """Statistik, korelasi & kontribusi kriteria dibandingkan dengan hitungan tangan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        c1 = Kriteria.objects.create(kode='C1', nama='Penjualan', bobot=3, sifat='benefit')
+        c2 = Kriteria.objects.create(kode='C2', nama='Biaya', bobot=1, sifat='cost')
+        cls.periode = Periode.objects.create(
+            nama='Periode 1', tanggal_mulai=datetime.date(2024, 1, 1),
+            tanggal_selesai=datetime.date(2024, 1, 31), is_active=True,
+        )
+        produk = [Produk.objects.create(nama=f'Produk {i}') for i in range(3)]
+        X = [[1, 3], [2, 2], [3, 1]]
+        NilaiProduk.objects.bulk_create([
+            NilaiProduk(produk=p, kriteria=k, periode=cls.periode, nilai=X[i][j])
+            for i, p in enumerate(produk)
+            for j, k in enumerate((c1, c2))
+        ])
+
+    def test_hitungan_tangan(self):
+        analysis = get_kriteria_analysis(self.periode)
+        self.assertEqual(list(analysis), ['Penjualan', 'Biaya'])
+        for nama in analysis:
+            item = analysis[nama]
+            self.assertEqual((item['total_data'], item['min'], item['max']), (3, 1, 3))
+            self.assertAlmostEqual(item['rata_rata'], 2)
+            # simpangan baku populasi dari 1, 2, 3
+            self.assertAlmostEqual(item['std_dev'], (2 / 3) ** 0.5)
+
+        # kolom ternormalisasi [1, 2, 3] / sqrt(14) dan [3, 2, 1] / sqrt(14), dikali bobot 3 & 1:
+        # skor TOPSIS 0, 0.5, 1 -> naik searah C1 (korelasi 1), berlawanan dengan C2 (-1)
+        self.assertAlmostEqual(analysis['Penjualan']['korelasi'], 1)
+        self.assertAlmostEqual(analysis['Biaya']['korelasi'], -1)
+        # jarak kuadrat ke solusi ideal negatif per kolom: 9 * 5 / 14 dan 1 * 5 / 14 -> 90% : 10%
+        self.assertAlmostEqual(analysis['Penjualan']['kontribusi'], 90)
+        self.assertAlmostEqual(analysis['Biaya']['kontribusi'], 10)
+
+
+class EksporTest(DataSpkTestCase):
+    """Ekspor dibaca per halaman keyset, hasilnya sama dengan sekali baca"""
+
+    @mock.patch('spk.ekspor.UKURAN_CHUNK', 2)
+    def test_baris_nilai_per_halaman(self):
+        baris = list(baris_nilai())
+        self.assertEqual(len(baris), 3 * 5 * 3)
+        self.assertEqual(baris, list(NilaiProduk.objects.order_by(
+            'periode__tanggal_mulai', 'produk_id', 'kriteria__kode'
+        ).values_list(
+            'periode__nama', 'produk_id', 'produk__nama', 'kriteria__kode',
+            'nilai', 'created_by__username', 'updated_at',
+        )))
+        self.assertEqual(list(baris_nilai(self.periode[1])), baris[15:30])
+
+    @mock.patch('spk.ekspor.UKURAN_CHUNK', 2)
+    def test_baris_ranking_per_halaman(self):
+        with redirect_stdout(io.StringIO()):
+            baris = list(baris_ranking(self.periode))
+        self.assertEqual(len(baris), 3 * 5)
+        self.assertEqual(baris[5:10], [
+            (item['periode'], item['rank'], item['produk_id'], item['produk'], item['nilai'])
+            for item in ambil_ranking(self.periode[1])
+        ])
+
+
+class KernelMcdmTest(SimpleTestCase):
+    """Kernel SAW/WP dibandingkan dengan hitungan tangan, termasuk sel kosong (0)"""
+
+    # kriteria 1 benefit, kriteria 2 cost; produk 2 & 3 masing-masing punya satu sel kosong
+    X = np.array([[4.0, 2.0], [2.0, 0.0], [0.0, 4.0]])
+    bobot = np.array([1.0, 1.0])
+    benefit = np.array([True, False])
+
+    def test_saw_sel_kosong_bernilai_nol(self):
+        # benefit: 4/4, 2/4, kosong; cost: 2/2, kosong, 2/4
+        np.testing.assert_allclose(saw(self.X, self.bobot, self.benefit), [1.0, 0.25, 0.25])
+
+    def test_wp_sel_kosong_memakai_nilai_terburuk_kolom(self):
+        # kosong -> 2 (min benefit) dan 4 (max cost): S = sqrt(4/2), sqrt(2/4), sqrt(2/4)
+        np.testing.assert_allclose(wp(self.X, self.bobot, self.benefit), [0.5, 0.25, 0.25])
+
+    def test_batch_sama_dengan_per_periode(self):
+        X = np.stack([self.X, self.X[::-1]])
+        for kernel in (saw, wp):
+            hasil = kernel(X, self.bobot, self.benefit)
+            np.testing.assert_allclose(hasil[0], kernel(self.X, self.bobot, self.benefit))
+            np.testing.assert_allclose(hasil[1], kernel(self.X[::-1], self.bobot, self.benefit))
+
+
+class TabelRankingTest(SimpleTestCase):
+    """Hasil ranking berbentuk kolom tetap bisa dipakai seperti list dict"""
+
+    def setUp(self):
+        self.tabel = TabelRanking.dari_array(
+            'Periode "1"', [7, 3, 5], {7: 'Kopi', 3: 'Teh é', 5: 'Susu'}, [0.25, 0.75, 0.5], [3, 1, 2]
+        )
+
+    def test_urut_rank_dan_baris_dict(self):
+        self.assertEqual([item['produk_id'] for item in self.tabel], [3, 5, 7])
+        self.assertEqual(self.tabel[-1], {
+            'produk_id': 7, 'produk': 'Kopi', 'nilai': 0.25, 'rank': 3, 'periode': 'Periode "1"',
+        })
+
+    def test_slice_dan_cari(self):
+        halaman = self.tabel[1:]
+        self.assertIsInstance(halaman, TabelRanking)
+        self.assertEqual(halaman.ke_list(), self.tabel.ke_list()[1:])
+        self.assertEqual(self.tabel.cari(5)['rank'], 2)
+        self.assertIsNone(self.tabel.cari(99))
+        self.assertFalse(TabelRanking())
+
+    def test_json_dan_csv(self):
+        self.assertEqual(self.tabel.ke_json(), json.dumps(self.tabel.ke_list()))
+        self.assertEqual(TabelRanking().ke_json(), '[]')
+        baris = list(csv.reader(io.StringIO(self.tabel.ke_csv())))
+        self.assertEqual(baris[0], ['produk_id', 'produk', 'nilai', 'rank', 'periode'])
+        self.assertEqual(baris[1], ['3', 'Teh é', '0.75', '1', 'Periode "1"'])
+
+
+class HalamanRankingTest(DataSpkTestCase):
+    """Seleksi top-k dengan limit/offset sama dengan mengiris ranking lengkap, termasuk skor seri"""
+
+    def setUp(self):
+        super().setUp()
+        # produk 1-3 punya nilai sama persis di periode aktif: skornya seri
+        NilaiProduk.objects.filter(periode=self.periode[2], produk__in=self.produk[1:4]).update(nilai=12)
+        self.periode_aktif = self.periode[2]
+
+    def test_hitung_topsis(self):
+        with redirect_stdout(io.StringIO()):
+            lengkap = hitung_topsis(self.periode_aktif.id).ke_list()
+            self.assertEqual(len({item['nilai'] for item in lengkap[1:4]}), 1)
+            for offset in range(len(lengkap) + 1):
+                for limit in range(1, len(lengkap) + 2):
+                    halaman = hitung_topsis(self.periode_aktif.id, limit=limit, offset=offset).ke_list()
+                    self.assertEqual(halaman, lengkap[offset:offset + limit], (limit, offset))
+
+    def test_hitung_banyak_metode(self):
+        lengkap = hitung_banyak_metode(self.periode_aktif)
+        for kode, baris in lengkap.items():
+            self.assertEqual(len({item['nilai'] for item in baris[1:4]}), 1, kode)
+        for offset in range(len(self.produk) + 1):
+            for limit in range(1, len(self.produk) + 2):
+                halaman = hitung_banyak_metode(self.periode_aktif, limit=limit, offset=offset)
+                for kode, baris in lengkap.items():
+                    self.assertEqual(halaman[kode], baris[offset:offset + limit], (kode, limit, offset))
+
+
+class SnapshotTest(DataSpkTestCase):
+    """Snapshot matriks dibaca lewat memmap dan dihitung tanpa DB"""
+
+    def test_snapshot_sama_dengan_ranking_db(self):
+        with tempfile.TemporaryDirectory() as direktori:
+            status = list(tulis_snapshot(self.periode, direktori))
+            self.assertEqual([s for _, s in status], ['ditulis'] * 3)
+            self.assertEqual([s for _, s in tulis_snapshot(self.periode, direktori)], ['lewat'] * 3)
+
+            with self.assertNumQueries(0):
+                snapshot = buka_snapshot(self.periode[2].id, direktori)
+                hasil = hitung_topsis_snapshot(snapshot)
+            self.assertIsInstance(snapshot['X'], np.memmap)
+            self.assertEqual(snapshot['X'].shape, (5, 3))
+            self.assertEqual(hasil, ambil_ranking(self.periode[2]))
+
+    def test_tulis_ulang_terhenti_tidak_memakai_meta_lama(self):
+        with tempfile.TemporaryDirectory() as direktori:
+            list(tulis_snapshot(self.periode[:1], direktori))
+            NilaiProduk.objects.filter(periode=self.periode[0]).first().save()
+            with mock.patch('spk.snapshot.np.savez', side_effect=OSError('disk penuh')):
+                with self.assertRaises(OSError):
+                    list(tulis_snapshot(self.periode[:1], direktori))
+            self.assertIsNone(versi_snapshot(self.periode[0].id, direktori))
+            self.assertEqual(daftar_snapshot(direktori), [])
+            with self.assertRaises(FileNotFoundError):
+                buka_snapshot(self.periode[0].id, direktori)
+
+
+class BackfillRankingTest(DataSpkTestCase):
+    """Backfill menghitung ulang periode basi saja, dan bisa dilanjutkan"""
+
+    def test_backfill_setelah_bobot_berubah(self):
+        self.assertEqual(backfill_ranking(self.periode, ukuran_chunk=2, ukuran_tulis=2), 3)
+        kriteria = self.kriteria[0]
+        kriteria.bobot = 10
+        kriteria.save()
+        self.assertEqual(len(periode_basi(self.periode)), 3)
+
+        progres = []
+        jumlah = backfill_ranking(self.periode, ukuran_chunk=2, ukuran_tulis=2, progres=lambda *a: progres.append(a[:2]))
+        self.assertEqual(jumlah, 3)
+        self.assertEqual(progres, [(2, 3), (3, 3)])
+        self.assertEqual(periode_basi(self.periode), [])
+        self.assertFalse(PeriodeKotor.objects.exists())
+        self.assertEqual(backfill_ranking(self.periode), 0)
+        self.assertEqual(backfill_ranking(self.periode, paksa=True), 3)
+
+
+class RankingLatarTest(DataSpkTestCase):
+    """Antrian PeriodeKotor hanya diisi kalau ranking dihitung ranking_worker"""
+
+    def test_tanpa_latar_tidak_antri(self):
+        NilaiProduk.objects.filter(periode=self.periode[2]).first().save()
+        self.kriteria[0].save()
+        self.assertFalse(PeriodeKotor.objects.exists())
+
+    @override_settings(SPK_RANKING_LATAR=True)
+    def test_latar_antri(self):
+        NilaiProduk.objects.filter(periode=self.periode[2]).first().save()
+        self.assertEqual(list(PeriodeKotor.objects.values_list('periode_id', flat=True)), [self.periode[2].id])
+        self.kriteria[0].save()
+        self.assertEqual(PeriodeKotor.objects.count(), 3)
+
+    def login_staff(self):
+        staff = User.objects.bulk_create([User(username='input')])[0]
+        UserProfile.objects.create(user=staff, role='staff')
+        self.client.force_login(staff)
+
+    def versi_tersimpan(self):
+        return dict(HasilRanking.objects.values_list('periode_id', 'versi').distinct())
+
+    @override_settings(SPK_RANKING_LATAR=True)
+    def test_input_nilai_tidak_menghitung_ranking(self):
+        self.login_staff()
+        Kriteria.objects.filter(kode='C1').update(bisa_diinput_user=True)
+        ambil_ranking(self.periode[2])
+        versi_lama = HasilRanking.objects.filter(periode=self.periode[2]).values_list('versi', flat=True).first()
+
+        response = self.client.post(reverse('input_nilai'), {
+            'produk': self.produk[0].id, 'kriteria': self.kriteria[0].id, 'nilai': 99,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(set(HasilRanking.objects.filter(periode=self.periode[2]).values_list('versi', flat=True)), {versi_lama})
+        self.assertTrue(PeriodeKotor.objects.filter(periode=self.periode[2]).exists())
+
+    @override_settings(SPK_RANKING_LATAR=True)
+    def test_pembaca_memakai_ranking_terakhir(self):
+        self.login_staff()
+        segarkan_ranking(self.periode)
+        versi_lama = self.versi_tersimpan()
+        NilaiProduk.objects.filter(periode=self.periode[2], produk=self.produk[0]).update(nilai=99)
+        NilaiProduk.objects.filter(periode=self.periode[2], produk=self.produk[0]).first().save()
+
+        # dashboard (riwayat ranking) dan ekspor semua periode tidak menghitung ulang
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.client.get(reverse('user_home')).status_code, 200)
+            response = self.client.get(reverse('export_report', args=['ranking_semua']), {'format': 'csv'})
+            b''.join(response.streaming_content)
+        self.assertEqual(self.versi_tersimpan(), versi_lama)
+
+        # worker menghitung ulang dan mengosongkan antrian
+        jeda = datetime.timedelta(0)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(proses_antrian(jeda, jeda), [self.periode[2]])
+        self.assertEqual(periode_basi(self.periode), [])
+        self.assertFalse(PeriodeKotor.objects.exists())
+
+
+class MemoRequestTest(DataSpkTestCase):
+    """Satu view dashboard menghitung ranking & memuat matriks tiap periode sekali saja"""
+
+    def test_home_staff(self):
+        UserProfile.objects.create(user=self.user, role='staff')
+        self.client.force_login(self.user)
+
+        dihitung, dimuat = [], []
+        asli_batch, asli_tensor = hitung_topsis_batch, spk_utils.muat_tensor_keputusan
+
+        def batch(periode_ids):
+            periode_ids = list(periode_ids)
+            dihitung.extend(periode_ids)
+            return asli_batch(periode_ids)
+
+        def tensor(periode_ids, *args, **kwargs):
+            periode_ids = list(periode_ids)
+            dimuat.extend(periode_ids)
+            return asli_tensor(periode_ids, *args, **kwargs)
+
+        with mock.patch('spk.ranking.hitung_topsis_batch', batch), \
+                mock.patch('spk.utils.muat_tensor_keputusan', tensor):
+            response = self.client.get(reverse('user_home'))
+        self.assertEqual(response.status_code, 200)
+        # periode aktif (ranking, top performer, analisis kriteria) dan periode
+        # sebelumnya (improvement) masing-masing sekali
+        periode = sorted([self.periode[1].id, self.periode[2].id])
+        self.assertEqual(sorted(dihitung), periode)
+        self.assertEqual(sorted(dimuat), periode)
+        # minimal: ranking dipakai ulang top performer, matriks dipakai ulang analisis kriteria
+        memo = response.wsgi_request.memo
+        self.assertGreaterEqual(memo.hit, 2)
+        self.assertGreater(memo.miss, 0)
+
+
+class MiddlewareAsyncTest(DataSpkTestCase):
+    """Middleware SPK jalan native di ASGI; thread pool API punya memo & catatan sendiri"""
+
+    async def test_request_async(self):
+        viewer = (await User.objects.abulk_create([User(username='viewer')]))[0]
+        await UserProfile.objects.acreate(user=viewer, role='viewer')
+        await self.async_client.aforce_login(viewer)
+        response = await self.async_client.get(reverse('hasil_topsis'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.asgi_request.profile.role, 'viewer')
+        self.assertIsNotNone(response.asgi_request.memo)
+        self.assertNotIn('Server-Timing', response)
+        with override_settings(SPK_TIMING_HEADER=True):
+            response = await self.async_client.get(reverse('hasil_topsis'))
+        self.assertRegex(response['Server-Timing'], r'db;desc="[1-9]\d* query"')
+
+    async def test_thread_pool_memo_dan_catatan_sendiri(self):
+        catatan, token = mulai_catatan()
+        token_memo = mulai_memo_request()
+        try:
+            def kerja():
+                with ukur_bagian('topsis'):
+                    return memo_aktif(), catatan_aktif()
+            hasil = await asyncio.gather(_di_thread(kerja)(), _di_thread(kerja)())
+            memo = memo_aktif()
+        finally:
+            selesai_memo_request(token_memo)
+            selesai_catatan(token)
+        (memo_1, catatan_1), (memo_2, catatan_2) = hasil
+        self.assertNotIn(memo_1, (memo, memo_2))
+        self.assertNotIn(catatan_1, (catatan, catatan_2))
+        self.assertIn('topsis', catatan.bagian)
+
+
+class ServerTimingTest(DataSpkTestCase):
+    """Header Server-Timing hanya untuk admin (atau DEBUG / SPK_TIMING_HEADER)"""
+
+    def login(self, role):
+        user = User.objects.bulk_create([User(username=role)])[0]
+        UserProfile.objects.create(user=user, role=role)
+        self.client.force_login(user)
+
+    def test_viewer_tanpa_header(self):
+        self.login('viewer')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('hasil_topsis')))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('hasil_topsis')))
+
+    def test_admin_dapat_header(self):
+        self.login('admin')
+        self.assertIn('Server-Timing', self.client.get(reverse('hasil_topsis')))
+        with override_settings(SPK_TIMING_HEADER=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('hasil_topsis')))
+
+
+class ProfilMiddlewareTest(DataSpkTestCase):
+    """Role disimpan di session, tapi perubahan profil langsung berlaku"""
+
+    def setUp(self):
+        super().setUp()
+        self.viewer = User.objects.bulk_create([User(username='viewer')])[0]
+        self.profil = UserProfile.objects.create(user=self.viewer, role='viewer')
+        self.client.force_login(self.viewer)
+
+    def query_profil(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if '"spk_userprofile"' in q['sql']]
+
+    def test_profil_dari_session(self):
+        response, query = self.query_profil(reverse('hasil_topsis'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(query), 1)
+        response, query = self.query_profil(reverse('hasil_topsis'))
+        self.assertEqual(response.wsgi_request.profile.role, 'viewer')
+        self.assertEqual(query, [])
+
+    @override_settings(SPK_REFERENSI_TTL=60)
+    def test_request_hangat_tanpa_query_profil(self):
+        self.client.get(reverse('user_home'))
+        # sisa query: user (auth), versi periode, ranking tersimpan, 2x hitung
+        # nilai; versi profil dibaca dari cache versi referensi (belum lewat TTL)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('user_home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.profile.role, 'viewer')
+
+    def test_role_baru_berlaku_di_request_berikutnya(self):
+        self.assertRedirects(self.client.get(reverse('input_nilai')), reverse('user_home'), fetch_redirect_response=False)
+        self.profil.role = 'staff'
+        self.profil.save()
+        response = self.client.get(reverse('input_nilai'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.profile.role, 'staff')
+
+        # role diturunkan lagi: akses langsung dicabut
+        self.profil.role = 'viewer'
+        self.profil.save()
+        self.assertEqual(self.client.get(reverse('input_nilai')).status_code, 302)
+
+    def test_profil_dihapus(self):
+        self.client.get(reverse('hasil_topsis'))
+        self.profil.delete()
+        response = self.client.get(reverse('hasil_topsis'))
+        self.assertIsNone(response.wsgi_request.profile)
+        self.assertEqual(response.status_code, 302)
+
+
+class ImporNilaiTest(DataSpkTestCase):
+    """Import CSV: nilai tidak valid ditolak, versi data selalu ikut naik"""
+
+    def impor(self, teks, **kwargs):
+        kwargs.setdefault('periode', self.periode[2])
+        return impor_nilai_csv(io.StringIO(teks), **kwargs)
+
+    def test_nilai_tidak_valid_ditolak(self):
+        laporan = self.impor(
+            'produk,kriteria,nilai\n'
+            'Produk 0,C1,nan\nProduk 0,C2,inf\nProduk 0,C3,"1,234"\nProduk 1,C1,"1,5"\nProduk 1,C2,2.25\n'
+        )
+        self.assertEqual((laporan['tersimpan'], laporan['gagal']), (2, 3))
+        self.assertEqual([nomor for nomor, _ in laporan['errors']], [2, 3, 4])
+        nilai = NilaiProduk.objects.filter(produk=self.produk[1], periode=self.periode[2])
+        self.assertEqual(nilai.get(kriteria=self.kriteria[0]).nilai, 1.5)
+        self.assertEqual(nilai.get(kriteria=self.kriteria[1]).nilai, 2.25)
+
+    def test_versi_naik_per_chunk_walaupun_chunk_berikutnya_gagal(self):
+        versi = VersiData.versi_periode(self.periode[2].id)
+        asli = NilaiProduk.objects.bulk_create
+        panggilan = []
+
+        def bulk_create(*args, **kwargs):
+            panggilan.append(1)
+            if len(panggilan) > 1:
+                raise IntegrityError('gagal')
+            return asli(*args, **kwargs)
+
+        with mock.patch.object(NilaiProduk.objects, 'bulk_create', bulk_create):
+            with self.assertRaises(IntegrityError):
+                self.impor('produk,kriteria,nilai\nProduk 0,C1,99\nProduk 1,C1,98\n', ukuran_chunk=1)
+        self.assertGreater(VersiData.versi_periode(self.periode[2].id), versi)
+
+    def test_pembuat_hanya_ditimpa_kalau_ada_user(self):
+        nilai = NilaiProduk.objects.filter(produk=self.produk[0], kriteria=self.kriteria[0])
+        self.impor('produk,kriteria,nilai\nProduk 0,C1,55\n')
+        self.assertEqual(nilai.get(periode=self.periode[2]).nilai, 55)
+        self.assertEqual(nilai.get(periode=self.periode[2]).created_by, self.user)
+
+        admin = User.objects.bulk_create([User(username='admin2')])[0]
+        self.impor('produk,kriteria,nilai\nProduk 0,C1,56\n', periode=self.periode[1], user=admin)
+        self.assertEqual(nilai.get(periode=self.periode[1]).created_by, admin)
+
+    def test_staff_hanya_periode_aktif(self):
+        staff = User.objects.bulk_create([User(username='staff2')])[0]
+        UserProfile.objects.create(user=staff, role='staff')
+        Kriteria.objects.filter(kode='C1').update(bisa_diinput_user=True)
+        self.client.force_login(staff)
+        berkas = SimpleUploadedFile('nilai.csv', b'produk,kriteria,nilai,periode\nProduk 0,C1,77,Periode 0\nProduk 0,C1,78,\n')
+        response = self.client.post(reverse('import_nilai'), {'berkas': berkas, 'periode': self.periode[0].id})
+        self.assertEqual(response.context['laporan']['tersimpan'], 1)
+        self.assertEqual(NilaiProduk.objects.get(produk=self.produk[0], kriteria=self.kriteria[0], periode=self.periode[0]).nilai, 10)
+        self.assertEqual(NilaiProduk.objects.get(produk=self.produk[0], kriteria=self.kriteria[0], periode=self.periode[2]).nilai, 78)
+
+    def test_periode_bukan_angka(self):
+        admin = User.objects.bulk_create([User(username='admin2')])[0]
+        UserProfile.objects.create(user=admin, role='admin')
+        self.client.force_login(admin)
+        berkas = SimpleUploadedFile('nilai.csv', b'produk,kriteria,nilai\nProduk 0,C1,77\n')
+        response = self.client.post(reverse('import_nilai'), {'berkas': berkas, 'periode': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['laporan'])
+
+
+class ReferensiBasiTest(DataSpkTestCase):
+    """Ranking tidak boleh dihitung dengan bobot lama lalu disimpan dengan versi baru"""
+
+    def test_bobot_dari_proses_lain_langsung_dipakai(self):
+        ambil_ranking(self.periode[2])
+        # proses lain mengubah bobot: cache referensi proses ini belum tahu
+        # (TTL belum habis), hanya VersiData di DB yang naik
+        with override_settings(SPK_REFERENSI_TTL=3600):
+            kriteria_referensi()
+            Kriteria.objects.filter(kode='C1').update(bobot=50)
+            VersiData.objects.filter(kunci='kriteria').update(versi=F('versi') + 1)
+            self.assertEqual(kriteria_referensi()['bobot'][0], 1)
+
+            hasil = ambil_ranking(self.periode[2])
+            self.assertEqual(kriteria_referensi()['bobot'][0], 50)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(hasil, hitung_topsis(self.periode[2].id))
+
+
+class ParameterPeriodeTest(DataSpkTestCase):
+    """Id periode dari query string divalidasi: bukan angka 400, tidak ada 404"""
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.bulk_create([User(username='admin')])[0]
+        UserProfile.objects.create(user=admin, role='admin')
+        self.client.force_login(admin)
+
+    def test_bandingkan_periode(self):
+        url = reverse('api_bandingkan_periode')
+        ke = self.periode[2].id
+        self.assertEqual(self.client.get(url, {'dari': 'abc', 'ke': ke}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ke': ke}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'dari': 999, 'ke': ke}).status_code, 404)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.client.get(url, {'dari': self.periode[0].id, 'ke': ke}).status_code, 200)
+
+    def test_periode_opsional(self):
+        for nama in ('api_ranking_metode', 'api_sensitivitas'):
+            url = reverse(nama)
+            self.assertEqual(self.client.get(url, {'periode': '1 OR 1=1'}).status_code, 400)
+            self.assertEqual(self.client.get(url, {'periode': 999}).status_code, 404)
+            self.assertEqual(self.client.get(url).json()['periode'], 'Periode 2')
+
+    def test_api_async(self):
+        # hanya widget ringkasan: widget ranking dihitung di thread pool dengan
+        # koneksi DB lain, yang terkunci oleh transaksi TestCase
+        for url, param in ((reverse('api_dashboard'), {'widget': 'ringkasan'}),
+                           (reverse('api_widget', args=['ringkasan']), {})):
+            response = self.client.get(url, {**param, 'periode': 'abc'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+            self.assertEqual(self.client.get(url, {**param, 'periode': 999}).status_code, 404)
+            self.assertEqual(self.client.get(url, {**param, 'periode': self.periode[0].id}).json()['periode'], 'Periode 0')
+            self.assertEqual(self.client.get(url, param).json()['periode'], 'Periode 2')
+
+
+class DataAcakTestCase(DataSpkTestCase):
+    """Data DataSpkTestCase dengan nilai berbeda per periode; produk 4 tanpa nilai C3 di periode 0"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        rng = np.random.default_rng(11)
+        semua = list(NilaiProduk.objects.order_by('id'))
+        for obj in semua:
+            obj.nilai = float(rng.integers(1, 100))
+        NilaiProduk.objects.bulk_update(semua, ['nilai'])
+        NilaiProduk.objects.filter(periode=cls.periode[0], produk=cls.produk[4], kriteria=cls.kriteria[2]).delete()
+
+    def assertRankingSama(self, hasil, acuan):
+        self.assertEqual(hasil.produk_ids.tolist(), acuan.produk_ids.tolist())
+        self.assertEqual(hasil.rank.tolist(), acuan.rank.tolist())
+        np.testing.assert_allclose(hasil.nilai, acuan.nilai)
+
+
+class HitungBatchTest(DataAcakTestCase):
+    """hitung_topsis_batch sama dengan hitung_topsis per periode"""
+
+    def test_batch_sama_dengan_per_periode(self):
+        batch = hitung_topsis_batch([p.id for p in self.periode])
+        self.assertEqual(batch['periode_ids'].tolist(), [p.id for p in self.periode])
+        for i, periode in enumerate(self.periode):
+            urutan = np.argsort(batch['rank'][i], kind='stable')
+            with redirect_stdout(io.StringIO()):
+                acuan = hitung_topsis(periode.id)
+            self.assertRankingSama(
+                TabelRanking(periode.nama, batch['produk_ids'][urutan], [''] * len(urutan),
+                             batch['nilai'][i][urutan], batch['rank'][i][urutan]),
+                acuan,
+            )
+
+
+class RiwayatRankingTest(DataAcakTestCase):
+    """Riwayat ranking rentang periode dihitung ulang per PERIODE_PER_BATCH periode"""
+
+    def test_riwayat_setelah_bobot_berubah(self):
+        admin = User.objects.bulk_create([User(username='admin')])[0]
+        UserProfile.objects.create(user=admin, role='admin')
+        self.client.force_login(admin)
+        self.kriteria[0].bobot = 9
+        self.kriteria[0].save()
+
+        with mock.patch('spk.ranking.PERIODE_PER_BATCH', 2), \
+                mock.patch('spk.ranking.hitung_topsis_batch', wraps=hitung_topsis_batch) as batch:
+            response = self.client.get(reverse('api_riwayat_ranking'), {
+                'dari': self.periode[0].id, 'sampai': self.periode[2].id,
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([len(c.args[0]) for c in batch.call_args_list], [2, 1])
+        self.assertEqual(periode_basi(self.periode), [])
+        for periode in self.periode:
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(ambil_ranking(periode), hitung_topsis(periode.id))
+
+
+class RankingInkrementalTest(DataAcakTestCase):
+    """Update satu sel lewat statistik berjalan sama dengan hitung ulang penuh"""
+
+    def test_inkremental_sama_dengan_hitung_ulang(self):
+        periode = self.periode[2]
+        X, produk_ids, kriteria_ids = muat_matriks_keputusan(periode.id)
+        produk_max = int(produk_ids[X[:, 0].argmax()])
+        produk_min = int(produk_ids[X[:, 1].argmin()])
+        perubahan = [
+            (self.produk[0].id, kriteria_ids[2], 55.0),   # sel biasa
+            (produk_max, kriteria_ids[0], 0.5),           # nilai max kolom hilang
+            (produk_min, kriteria_ids[1], 500.0),         # nilai min kolom hilang (jadi max)
+            (produk_max, kriteria_ids[0], 1000.0),        # max baru
+        ]
+        with mock.patch.object(StatistikTopsis, 'dari_database', wraps=StatistikTopsis.dari_database) as muat:
+            for produk_id, kriteria_id, nilai in perubahan:
+                obj, _ = NilaiProduk.objects.update_or_create(
+                    produk_id=produk_id, kriteria_id=int(kriteria_id), periode=periode,
+                    defaults={'nilai': nilai},
+                )
+                hasil = perbarui_ranking_inkremental(obj)
+                with redirect_stdout(io.StringIO()):
+                    self.assertRankingSama(hasil, hitung_topsis(periode.id))
+        # statistik hanya dimuat sekali, sisanya lewat update inkremental
+        self.assertEqual(muat.call_count, 1)
+        self.assertEqual(ambil_ranking(periode), hasil)
+
+
+class SignalInvalidasiTest(DataSpkTestCase):
+    """Perubahan data lewat model membuat ranking tersimpan basi"""
+
+    def setUp(self):
+        super().setUp()
+        segarkan_ranking(self.periode)
+
+    def test_nilai_hanya_periodenya(self):
+        nilai = NilaiProduk.objects.filter(periode=self.periode[1]).first()
+        nilai.nilai = 99
+        nilai.save()
+        self.assertEqual(periode_basi(self.periode), [self.periode[1]])
+        segarkan_ranking(self.periode)
+        nilai.delete()
+        self.assertEqual(periode_basi(self.periode), [self.periode[1]])
+
+    def test_kriteria_dan_produk_semua_periode(self):
+        self.kriteria[1].bobot = 7
+        self.kriteria[1].save()
+        self.assertEqual(periode_basi(self.periode), self.periode)
+        segarkan_ranking(self.periode)
+        Produk.objects.create(nama='Produk baru')
+        self.assertEqual(periode_basi(self.periode), self.periode)
+
+    def test_periode_memuat_ulang_periode_aktif(self):
+        self.assertEqual(ambil_periode_aktif(), self.periode[2])
+        Periode.objects.filter(pk=self.periode[2].pk).first().delete()
+        self.assertEqual(periode_basi(self.periode[:2]), [])
+        self.assertEqual(ambil_periode_aktif(), None)
+
+
+class KondisionalTest(DataSpkTestCase):
+    """Halaman ranking dijawab 304 selama data periodenya tidak berubah"""
+
+    def setUp(self):
+        super().setUp()
+        viewer = User.objects.bulk_create([User(username='viewer')])[0]
+        UserProfile.objects.create(user=viewer, role='viewer')
+        self.client.force_login(viewer)
+        self.url = reverse('hasil_topsis')
+
+    def test_304_sampai_data_berubah(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        # periode lain berubah: halaman periode aktif tetap sama
+        NilaiProduk.objects.filter(periode=self.periode[0]).first().save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        NilaiProduk.objects.filter(periode=self.periode[2]).first().save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class EksporStreamingTest(DataSpkTestCase):
+    """Isi ekspor CSV/NDJSON yang dialirkan view"""
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.bulk_create([User(username='admin')])[0]
+        UserProfile.objects.create(user=admin, role='admin')
+        self.client.force_login(admin)
+
+    def isi(self, report_type, format_ekspor):
+        response = self.client.get(reverse('export_report', args=[report_type]), {'format': format_ekspor})
+        self.assertTrue(response.streaming)
+        self.assertIn(f'{report_type}_report_', response['Content-Disposition'])
+        with redirect_stdout(io.StringIO()):
+            return b''.join(response.streaming_content).decode()
+
+    def test_nilai_csv(self):
+        baris = list(csv.reader(io.StringIO(self.isi('nilai', 'csv'))))
+        self.assertEqual(baris[0], KOLOM_NILAI)
+        self.assertEqual(len(baris), 1 + 3 * 5 * 3)
+        self.assertEqual(baris[1][:5], ['Periode 0', str(self.produk[0].id), 'Produk 0', 'C1', '10.0'])
+
+    def test_ranking_ndjson(self):
+        baris = [json.loads(b) for b in self.isi('ranking', 'ndjson').splitlines()]
+        self.assertEqual([list(b) for b in baris], [KOLOM_RANKING] * 5)
+        self.assertEqual([b['rank'] for b in baris], [1, 2, 3, 4, 5])
+        self.assertEqual(baris[0]['produk'], 'Produk 4')
+        self.assertEqual({b['periode'] for b in baris}, {'Periode 2'})
+
+
+class BackfillProsesTest(CacheProsesMixin, TransactionTestCase):
+    """Backfill dengan ProcessPoolExecutor (worker spawn membaca DB yang sama)"""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('worker proses tidak bisa membuka DB SQLite in-memory')
+        kriteria = [
+            Kriteria.objects.create(kode=f'C{i}', nama=f'Kriteria {i}', bobot=i, sifat='benefit')
+            for i in range(1, 3)
+        ]
+        produk = [Produk.objects.create(nama=f'Produk {i}') for i in range(4)]
+        self.periode = [
+            Periode.objects.create(
+                nama=f'Periode {i}',
+                tanggal_mulai=datetime.date(2024, 1, 1) + datetime.timedelta(days=30 * i),
+                tanggal_selesai=datetime.date(2024, 1, 29) + datetime.timedelta(days=30 * i),
+            )
+            for i in range(3)
+        ]
+        NilaiProduk.objects.bulk_create([
+            NilaiProduk(produk=p, kriteria=k, periode=per, nilai=(i * 7 + j * 3 + n * 5) % 11 + 1)
+            for n, per in enumerate(self.periode)
+            for i, p in enumerate(produk)
+            for j, k in enumerate(kriteria)
+        ])
+
+    def test_backfill_dengan_worker(self):
+        self.assertEqual(backfill_ranking(self.periode, workers=2, ukuran_chunk=1, ukuran_tulis=1), 3)
+        self.assertEqual(periode_basi(self.periode), [])
+        for periode in self.periode:
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(ambil_ranking(periode), hitung_topsis(periode.id))
@@ -1,4 +1,5 @@
 from django.urls import path
+from .api import api_dashboard, api_widget
 from .views import (
     user_home, 
     user_login, 
@@ -6,8 +7,13 @@ from .views import (
     hasil_topsis, 
     index, 
     input_nilai, 
+    import_nilai,
     analytics_dashboard, 
-    export_report
+    export_report,
+    api_bandingkan_periode,
+    api_riwayat_ranking,
+    api_ranking_metode,
+    api_sensitivitas,
 )
 
 urlpatterns = [
@@ -18,6 +24,13 @@ urlpatterns = [
     path('hasil/', hasil_topsis, name='hasil_topsis'),
     path('hasil/<int:periode_id>/', hasil_topsis, name='hasil_topsis_periode'),
     path('input-nilai/', input_nilai, name='input_nilai'),
+    path('import-nilai/', import_nilai, name='import_nilai'),
     path('analytics/', analytics_dashboard, name='analytics_dashboard'),
     path('export/<str:report_type>/', export_report, name='export_report'),
+    path('api/ranking/bandingkan/', api_bandingkan_periode, name='api_bandingkan_periode'),
+    path('api/ranking/riwayat/', api_riwayat_ranking, name='api_riwayat_ranking'),
+    path('api/ranking/metode/', api_ranking_metode, name='api_ranking_metode'),
+    path('api/sensitivitas/', api_sensitivitas, name='api_sensitivitas'),
+    path('api/dashboard/', api_dashboard, name='api_dashboard'),
+    path('api/widget/<str:nama>/', api_widget, name='api_widget'),
 ]
\ No newline at end of file
@@ -1,10 +1,200 @@
 import numpy as np
-from .models import Produk, Kriteria, NilaiProduk, Periode
+from .cache import memo_aktif, memo_request, kriteria_referensi, produk_referensi, ambil_periode_aktif
+from .instrumentasi import diukur
+from .models import NilaiProduk, Periode, VersiData
+from .tabel import TabelRanking
 
-def hitung_topsis(periode_id=None):
+
+def muat_matriks_keputusan(periode_id, produk_ids=None, kriteria_ids=None, default=0.0):
+    """
+    Ambil matriks keputusan (produk x kriteria) satu periode
+    dengan satu query values_list, lalu pivot langsung ke numpy.
+
+    Mengembalikan (X, produk_ids, kriteria_ids). Urutan baris mengikuti
+    produk_ids (default: id produk naik), urutan kolom mengikuti
+    kriteria_ids (default: kode kriteria). Sel tanpa nilai diisi `default`.
+    """
+    def muat():
+        T, _, p_ids, k_ids = muat_tensor_keputusan([periode_id], produk_ids, kriteria_ids, default)
+        X = T[0]
+        # hasil bisa dibagi lewat memo request, jadi dikunci dari perubahan
+        for arr in (X, p_ids, k_ids):
+            arr.flags.writeable = False
+        return X, p_ids, k_ids
+    
+    if memo_aktif() is None:
+        return muat()
+    return memo_request(_kunci_matriks(periode_id, produk_ids, kriteria_ids, default), muat)
+
+
+def _kunci_matriks(periode_id, produk_ids, kriteria_ids, default):
+    """
+    Kunci memo request untuk matriks satu periode. Id yang sama dengan urutan
+    default (semua produk / semua kriteria) disamakan dengan None, supaya
+    matriks yang sudah dimuat hitung_topsis_batch dipakai ulang.
+    """
+    if produk_ids is not None:
+        produk_ids = tuple(produk_ids)
+        if produk_ids == tuple(produk_referensi()['ids'].tolist()):
+            produk_ids = None
+    if kriteria_ids is not None:
+        kriteria_ids = tuple(kriteria_ids)
+        if kriteria_ids == tuple(kriteria_referensi()['ids'].tolist()):
+            kriteria_ids = None
+    versi = VersiData.versi_periode(periode_id)
+    return ('matriks', periode_id, versi, hash((produk_ids, kriteria_ids)), default)
+
+
+def muat_tensor_keputusan(periode_ids, produk_ids=None, kriteria_ids=None, default=0.0):
+    """
+    Versi banyak periode dari muat_matriks_keputusan: satu query untuk
+    semua periode, hasilnya tensor (periode x produk x kriteria).
+
+    Mengembalikan (T, periode_ids, produk_ids, kriteria_ids).
+    """
+    if produk_ids is None:
+        produk_ids = produk_referensi()['ids']
+    if kriteria_ids is None:
+        kriteria_ids = kriteria_referensi()['ids']
+    periode_ids = np.fromiter(periode_ids, dtype=np.int64)
+    produk_ids = np.fromiter(produk_ids, dtype=np.int64)
+    kriteria_ids = np.fromiter(kriteria_ids, dtype=np.int64)
+    
+    T = np.full(
+        (len(periode_ids), len(produk_ids), len(kriteria_ids)), default, dtype=float
+    )
+    if T.size == 0:
+        return T, periode_ids, produk_ids, kriteria_ids
+    
+    baris = NilaiProduk.objects.filter(periode_id__in=periode_ids.tolist()).values_list(
+        'periode_id', 'produk_id', 'kriteria_id', 'nilai'
+    )
+    data = np.array(list(baris), dtype=float).reshape(-1, 4)
+    if len(data) == 0:
+        return T, periode_ids, produk_ids, kriteria_ids
+    
+    p, ada_p = posisi_id(periode_ids, data[:, 0].astype(np.int64))
+    i, ada_i = posisi_id(produk_ids, data[:, 1].astype(np.int64))
+    j, ada_j = posisi_id(kriteria_ids, data[:, 2].astype(np.int64))
+    ada = ada_p & ada_i & ada_j
+    T[p[ada], i[ada], j[ada]] = data[ada, 3]
+    return T, periode_ids, produk_ids, kriteria_ids
+
+
+def posisi_id(ids, cari):
+    """Posisi tiap id `cari` di dalam `ids` (+ mask id yang ditemukan)"""
+    urutan = np.argsort(ids, kind='stable')
+    ids_urut = ids[urutan]
+    pos = np.searchsorted(ids_urut, cari)
+    pos = np.clip(pos, 0, max(len(ids) - 1, 0))
+    ada = ids_urut[pos] == cari
+    return urutan[pos], ada
+
+
+@diukur('topsis')
+def hitung_preferensi_topsis(X, bobot, benefit):
+    """
+    Kernel TOPSIS tervektorisasi. X berbentuk (..., produk, kriteria),
+    jadi satu matriks maupun tumpukan banyak periode dihitung sekaligus.
+    `benefit` adalah array bool per kriteria. Mengembalikan nilai
+    preferensi berbentuk (..., produk).
+    """
+    matriks_terbobot = normalisasi_terbobot(X, bobot)
+    A_plus, A_minus = solusi_ideal(matriks_terbobot, benefit)
+    
+    # JARAK KE SOLUSI IDEAL
+    D_plus = np.sqrt(np.sum((matriks_terbobot - A_plus)**2, axis=-1))
+    D_minus = np.sqrt(np.sum((matriks_terbobot - A_minus)**2, axis=-1))
+    
+    # NILAI PREFERENSI
+    return D_minus / (D_plus + D_minus + 1e-10)
+
+
+def normalisasi_terbobot(X, bobot):
+    """Normalisasi vektor per kolom kriteria lalu kalikan bobot"""
+    # NORMALISASI MATRIKS
+    pembagi = np.sqrt(np.sum(X**2, axis=-2, keepdims=True))
+    pembagi[pembagi == 0] = 1e-10
+    matriks_normalisasi = X / pembagi
+    
+    # MATRIKS BOBOT
+    return matriks_normalisasi * np.asarray(bobot, dtype=float)
+
+
+def solusi_ideal(matriks_terbobot, benefit):
+    """Solusi ideal positif & negatif (benefit: max/min, cost: min/max)"""
+    benefit = np.asarray(benefit, dtype=bool)
+    kolom_max = np.max(matriks_terbobot, axis=-2, keepdims=True)
+    kolom_min = np.min(matriks_terbobot, axis=-2, keepdims=True)
+    A_plus = np.where(benefit, kolom_max, kolom_min)
+    A_minus = np.where(benefit, kolom_min, kolom_max)
+    return A_plus, A_minus
+
+
+def ranking_dari_nilai(nilai):
+    """Peringkat (1 = terbaik) dari nilai preferensi pada sumbu terakhir, seri tetap urut produk"""
+    urutan = np.argsort(-nilai, axis=-1, kind='stable')
+    rank = np.empty_like(urutan)
+    np.put_along_axis(
+        rank, urutan, np.arange(1, nilai.shape[-1] + 1), axis=-1
+    )
+    return rank
+
+
+def indeks_teratas(nilai, k):
+    """
+    Indeks k nilai terbesar, urut seperti ranking_dari_nilai (seri: indeks kecil dulu).
+    Memakai np.partition, jadi hanya kandidat top-k yang diurutkan penuh.
+    """
+    n = len(nilai)
+    if k >= n:
+        return np.argsort(-nilai, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    ambang = np.partition(nilai, n - k)[n - k]
+    calon = np.flatnonzero(nilai >= ambang)
+    return calon[np.argsort(-nilai[calon], kind='stable')][:k]
+
+
+def hitung_topsis_batch(periode_ids):
+    """
+    Hitung TOPSIS untuk banyak periode sekaligus (satu query, satu pass numpy).
+    Mengembalikan dict berisi array periode_ids, produk_ids, nilai (periode x produk)
+    dan rank (periode x produk), atau None kalau belum ada produk/kriteria.
+    """
+    kriteria = kriteria_referensi()
+    if not len(kriteria['ids']):
+        return None
+    
+    T, periode_ids, produk_ids, kriteria_ids = muat_tensor_keputusan(
+        periode_ids, kriteria_ids=kriteria['ids']
+    )
+    if not len(produk_ids) or not len(periode_ids):
+        return None
+    
+    nilai = hitung_preferensi_topsis(T, kriteria['bobot'], kriteria['benefit'])
+    
+    # matriks tiap periode dipakai ulang muat_matriks_keputusan di request ini
+    memo = memo_aktif()
+    if memo:
+        for arr in (T, produk_ids, kriteria_ids):
+            arr.flags.writeable = False
+        for i, periode_id in enumerate(periode_ids.tolist()):
+            memo.simpan(_kunci_matriks(periode_id, None, kriteria_ids, 0.0), (T[i], produk_ids, kriteria_ids))
+    return {
+        'periode_ids': periode_ids,
+        'produk_ids': produk_ids,
+        'nilai': nilai,
+        'rank': ranking_dari_nilai(nilai),
+    }
+
+def hitung_topsis(periode_id=None, limit=None, offset=0):
     """
     Menghitung ranking produk menggunakan metode TOPSIS
-    berdasarkan periode tertentu
+    berdasarkan periode tertentu.
+    Dengan `limit`, hanya halaman rank offset+1 .. offset+limit yang dikembalikan
+    (seleksi top-k, tanpa mengurutkan semua produk).
+    Return TabelRanking (kolom produk_id, produk, nilai, rank urut rank).
     """
     try:
         # Tentukan periode
@@ -12,99 +202,49 @@ def hitung_topsis(periode_id=None):
             periode = Periode.objects.get(id=periode_id)
         else:
             # Ambil periode aktif terbaru
-            periode = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+            periode = ambil_periode_aktif()
         
         if not periode:
             print("Tidak ada periode aktif")
-            return []
+            return TabelRanking()
         
         print(f"Memproses TOPSIS untuk periode: {periode.nama}")
         
         # 1. AMBIL DATA DARI DATABASE untuk periode tertentu
-        produk_list = list(Produk.objects.all())
-        kriteria_list = list(Kriteria.objects.all().order_by('kode'))
+        kriteria = kriteria_referensi()
+        produk = produk_referensi()
+        produk_nama = produk['nama']
         
-        if not produk_list or not kriteria_list:
+        if not produk_nama or not len(kriteria['ids']):
             print("Tidak ada data produk atau kriteria")
-            return []
-        
-        # 2. BUAT MATRIKS KEPUTUSAN (Produk x Kriteria)
-        matriks_keputusan = []
-        nama_produk_list = []
-        
-        for produk in produk_list:
-            baris = []
-            for kriteria in kriteria_list:
-                try:
-                    # Cari nilai produk untuk kriteria ini di periode tertentu
-                    nilai_obj = NilaiProduk.objects.get(
-                        produk=produk, 
-                        kriteria=kriteria,
-                        periode=periode
-                    )
-                    baris.append(float(nilai_obj.nilai))
-                except NilaiProduk.DoesNotExist:
-                    # Jika tidak ada data, beri nilai default 0
-                    baris.append(0.0)
-            
-            matriks_keputusan.append(baris)
-            nama_produk_list.append(produk.nama)
-        
-        # Konversi ke numpy array
-        X = np.array(matriks_keputusan, dtype=float)
-        print(f"Matriks keputusan: {X.shape} untuk {len(produk_list)} produk")
-        
-        # 3. NORMALISASI MATRIKS
-        pembagi = np.sqrt(np.sum(X**2, axis=0))
-        pembagi[pembagi == 0] = 1e-10
-        matriks_normalisasi = X / pembagi
-        
-        # 4. MATRIKS BOBOT
-        bobot_kriteria = np.array([k.bobot for k in kriteria_list])
-        matriks_terbobot = matriks_normalisasi * bobot_kriteria
-        
-        # 5. SOLUSI IDEAL
-        solusi_ideal_positif = []
-        solusi_ideal_negatif = []
-        
-        for i, kriteria in enumerate(kriteria_list):
-            if kriteria.sifat == 'benefit':
-                solusi_ideal_positif.append(np.max(matriks_terbobot[:, i]))
-                solusi_ideal_negatif.append(np.min(matriks_terbobot[:, i]))
-            else:  # cost
-                solusi_ideal_positif.append(np.min(matriks_terbobot[:, i]))
-                solusi_ideal_negatif.append(np.max(matriks_terbobot[:, i]))
-        
-        A_plus = np.array(solusi_ideal_positif)
-        A_minus = np.array(solusi_ideal_negatif)
-        
-        # 6. HITUNG JARAK KE SOLUSI IDEAL
-        D_plus = np.sqrt(np.sum((matriks_terbobot - A_plus)**2, axis=1))
-        D_minus = np.sqrt(np.sum((matriks_terbobot - A_minus)**2, axis=1))
-        
-        # 7. NILAI PREFERENSI
-        nilai_preferensi = D_minus / (D_plus + D_minus + 1e-10)
-        
-        # 8. RANKING
-        hasil_akhir = []
-        for i, nama_produk in enumerate(nama_produk_list):
-            hasil_akhir.append({
-                'produk': nama_produk,
-                'nilai': float(nilai_preferensi[i]),
-                'rank': 0,
-                'periode': periode.nama  
-            })
-        
-        # Urutkan berdasarkan nilai preferensi (descending)
-        hasil_akhir.sort(key=lambda x: x['nilai'], reverse=True)
-        
-        # Beri peringkat
-        for i, item in enumerate(hasil_akhir):
-            item['rank'] = i + 1
+            return TabelRanking()
+        
+        # 2. BUAT MATRIKS KEPUTUSAN (Produk x Kriteria) dengan satu query nilai
+        X, produk_ids, _ = muat_matriks_keputusan(
+            periode.id,
+            produk_ids=produk['ids'],
+            kriteria_ids=kriteria['ids'],
+        )
+        nama_produk_list = [produk_nama[pid] for pid in produk_ids.tolist()]
+        print(f"Matriks keputusan: {X.shape} untuk {len(nama_produk_list)} produk")
+        
+        # 3-7. NORMALISASI, PEMBOBOTAN, SOLUSI IDEAL, JARAK & NILAI PREFERENSI
+        nilai_preferensi = hitung_preferensi_topsis(X, kriteria['bobot'], kriteria['benefit'])
+        
+        # 8. RANKING (urut nilai preferensi, descending)
+        k = len(nilai_preferensi) if limit is None else offset + limit
+        urutan = indeks_teratas(nilai_preferensi, k)[offset:]
+        hasil_akhir = TabelRanking(
+            periode.nama,
+            produk_ids[urutan],
+            [nama_produk_list[i] for i in urutan.tolist()],
+            nilai_preferensi[urutan],
+            np.arange(offset + 1, offset + len(urutan) + 1),
+        )
         
         print(f"Perhitungan TOPSIS selesai untuk periode {periode.nama}")
         return hasil_akhir
         
     except Exception as e:
         print(f"Error dalam hitung_topsis: {e}")
-        return []
\ No newline at end of file
+        return TabelRanking()
\ No newline at end of file
@@ -1,17 +1,32 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponseForbidden, JsonResponse
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+import csv
+import io
 import json
+from .cache import ambil_periode_aktif, produk_referensi, ambil_profil
+from .instrumentasi import render
 from .models import Produk, Kriteria, NilaiProduk, Periode, UserProfile
-from .utils import hitung_topsis
+from .ranking import ambil_ranking, ambil_halaman_ranking, status_ranking
+from .kondisional import kondisional_ranking
+from .tabel import TabelRanking
+from .inkremental import perbarui_ranking_inkremental
+from .importer import impor_nilai_csv
+from .mcdm import METODE, METODE_DEFAULT, hitung_banyak_metode, hitung_ranking_metode
+from .ekspor import FORMAT_STREAM, KOLOM_RANKING, KOLOM_NILAI, baris_ranking, baris_nilai, streaming_response
 from .analytics import (
     get_sales_analytics, 
     get_performance_comparison,
     get_top_performers,
     get_improvement_analysis,
-    get_kriteria_analysis
+    get_kriteria_analysis,
+    bandingkan_periode,
+    get_rank_trajectories,
+    get_sensitivitas_bobot,
 )
 
 def user_login(request):
@@ -27,11 +42,12 @@ def user_login(request):
         if user is not None:
             if user.is_active:
                 login(request, user)
-                try:
-                    profile = UserProfile.objects.get(user=user)
+                # sekalian simpan profil ke session untuk request berikutnya
+                profile = ambil_profil(request)
+                if profile:
                     role_display = dict(UserProfile.ROLE_CHOICES).get(profile.role, 'User')
                     messages.success(request, f'Selamat datang, {user.username}! ({role_display})')
-                except UserProfile.DoesNotExist:
+                else:
                     messages.success(request, f'Selamat datang, {user.username}!')
                 
                 return redirect('user_home')
@@ -48,41 +64,67 @@ def user_logout(request):
     messages.success(request, 'Anda telah berhasil logout.')
     return redirect('login')
 
+def _ambil_int(request, nama, default, minimum=1, maksimum=None):
+    """Ambil parameter GET bilangan bulat, dibatasi ke [minimum, maksimum]"""
+    try:
+        nilai = int(request.GET.get(nama, default))
+    except (TypeError, ValueError):
+        return default
+    nilai = max(nilai, minimum)
+    return min(nilai, maksimum) if maksimum else nilai
+
+def _periode_dari_get(request, nama, wajib=True):
+    """
+    Periode dari parameter GET `nama` (id). Id yang bukan angka -> 400,
+    id yang tidak ada -> 404. Kalau parameter kosong: 400 untuk parameter
+    wajib, selain itu periode aktif.
+    """
+    periode_id = request.GET.get(nama, '').strip()
+    if not periode_id:
+        if wajib:
+            raise BadRequest(f'Parameter {nama} wajib diisi')
+        return ambil_periode_aktif()
+    if not periode_id.isdigit():
+        raise BadRequest(f'Parameter {nama} harus berupa id periode')
+    return get_object_or_404(Periode, id=int(periode_id))
+
 def role_required(allowed_roles=[]):
     def decorator(view_func):
         @login_required
         def wrapper(request, *args, **kwargs):
-            try:
-                user_profile = UserProfile.objects.get(user=request.user)
-                if user_profile.role in allowed_roles or user_profile.role == 'admin':
-                    return view_func(request, *args, **kwargs)
-                else:
-                    messages.error(request, 'Anda tidak memiliki akses ke halaman ini.')
-                    return redirect('user_home')
-            except UserProfile.DoesNotExist:
+            # request.profile dipasang oleh spk.middleware.ProfilMiddleware
+            user_profile = request.profile
+            if user_profile is None:
                 messages.error(request, 'Profile user tidak ditemukan.')
                 return redirect('user_home')
+            if user_profile.role in allowed_roles or user_profile.role == 'admin':
+                return view_func(request, *args, **kwargs)
+            else:
+                messages.error(request, 'Anda tidak memiliki akses ke halaman ini.')
+                return redirect('user_home')
         return wrapper
     return decorator
 
 @login_required
 def user_home(request):
     """Dashboard utama - accessible by all roles"""
+    user_profile = request.profile
+    if user_profile is None:
+        messages.error(request, 'Profile user tidak ditemukan. Silakan hubungi admin.')
+        return redirect('logout')
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
-        
-        periode_aktif = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+        periode_aktif = ambil_periode_aktif()
         semua_periode = Periode.objects.all().order_by('-tanggal_mulai')
         
-        hasil_topsis = hitung_topsis(periode_aktif.id if periode_aktif else None)
-        hasil_json = json.dumps(hasil_topsis)
+        hasil_topsis = ambil_ranking(periode_aktif)
+        hasil_json = hasil_topsis.ke_json()
         
         sales_analytics = get_sales_analytics() if user_profile.is_staff_user() else {}
         top_performers = get_top_performers(periode_aktif) if user_profile.is_staff_user() else []
         improvements = get_improvement_analysis() if user_profile.is_staff_user() else []
         kriteria_analysis = get_kriteria_analysis(periode_aktif) if user_profile.is_staff_user() else {}
         
-        total_produk = Produk.objects.count()
+        total_produk = len(produk_referensi()['ids'])
         total_nilai = NilaiProduk.objects.count()
         nilai_user = NilaiProduk.objects.filter(created_by=request.user).count()
         
@@ -103,9 +145,6 @@ def user_home(request):
         }
         return render(request, 'spk/home.html', context)
         
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'Profile user tidak ditemukan. Silakan hubungi admin.')
-        return redirect('logout')
     except Exception as e:
         print(f"Error di home: {e}")
         context = {
@@ -126,18 +165,36 @@ def user_home(request):
         return render(request, 'spk/home.html', context)
 
 @role_required(['admin', 'staff', 'viewer'])
+@kondisional_ranking()
 def hasil_topsis(request, periode_id=None):
     """Halaman hasil TOPSIS - accessible by all roles"""
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
+        user_profile = request.profile
         
         if periode_id:
             periode = get_object_or_404(Periode, id=periode_id)
         else:
-            periode = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+            periode = ambil_periode_aktif()
         
         semua_periode = Periode.objects.all().order_by('-tanggal_mulai')
-        hasil_topsis = hitung_topsis(periode.id if periode else None)
+        
+        # TOPSIS dibaca dari ranking tersimpan, metode lain dihitung langsung
+        metode = request.GET.get('metode', METODE_DEFAULT)
+        if metode not in METODE:
+            metode = METODE_DEFAULT
+        
+        # hanya satu halaman ranking yang dimuat
+        per_halaman = _ambil_int(request, 'per_halaman', 50, maksimum=500)
+        halaman = _ambil_int(request, 'halaman', 1)
+        offset = (halaman - 1) * per_halaman
+        status = None
+        if metode == METODE_DEFAULT:
+            hasil_topsis, total = ambil_halaman_ranking(periode, per_halaman, offset)
+            status = status_ranking(periode)
+        else:
+            hasil_topsis = hitung_ranking_metode(periode, metode, limit=per_halaman, offset=offset)
+            total = len(produk_referensi()['ids']) if periode else 0
+        jumlah_halaman = max((total + per_halaman - 1) // per_halaman, 1)
         
         context = {
             'hasil': hasil_topsis,
@@ -145,6 +202,13 @@ def hasil_topsis(request, periode_id=None):
             'user_profile': user_profile,
             'periode_terpilih': periode,
             'semua_periode': semua_periode,
+            'metode': metode,
+            'daftar_metode': [(kode, label) for kode, (label, _) in METODE.items()],
+            'status_ranking': status,
+            'halaman': halaman,
+            'per_halaman': per_halaman,
+            'jumlah_halaman': jumlah_halaman,
+            'total_produk': total,
         }
         return render(request, 'spk/hasil_topsis.html', context)
         
@@ -163,13 +227,13 @@ def hasil_topsis(request, periode_id=None):
 def input_nilai(request):
     """Halaman input nilai - hanya untuk admin & staff"""
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
+        user_profile = request.profile
         
         if not user_profile.can_input_data():
             messages.error(request, 'Anda tidak memiliki izin untuk input data.')
             return redirect('user_home')
         
-        periode_aktif = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+        periode_aktif = ambil_periode_aktif()
         
         if not periode_aktif:
             messages.error(request, 'Tidak ada periode aktif. Silakan hubungi admin.')
@@ -196,6 +260,11 @@ def input_nilai(request):
                     }
                 )
                 
+                # ranking periode aktif langsung diperbarui dari statistik berjalan;
+                # dengan ranking latar, penghitungan ulang diserahkan ke ranking_worker
+                if not getattr(settings, 'SPK_RANKING_LATAR', False):
+                    perbarui_ranking_inkremental(nilai_obj)
+                
                 if created:
                     messages.success(request, f'Data {produk.nama} - {kriteria.nama} berhasil disimpan!')
                 else:
@@ -226,15 +295,72 @@ def input_nilai(request):
         messages.error(request, 'Terjadi error saat mengakses halaman input data.')
         return redirect('user_home')
 
+def _impor_berkas(request, berkas, user_profile, periode_aktif):
+    """
+    Jalankan import satu file upload. Admin boleh memilih periode (form atau
+    kolom CSV); staff hanya bisa mengisi periode aktif, seperti input_nilai.
+    """
+    periode = periode_aktif
+    periode_id = request.POST.get('periode') or ''
+    if user_profile.is_admin() and periode_id:
+        if not periode_id.isdigit():
+            messages.error(request, 'Periode tidak valid.')
+            return None
+        periode = Periode.objects.filter(id=periode_id).first() or periode_aktif
+    if not periode:
+        messages.error(request, 'Tidak ada periode aktif. Silakan hubungi admin.')
+        return None
+    
+    teks = io.TextIOWrapper(berkas.file, encoding='utf-8-sig', newline='')
+    try:
+        laporan = impor_nilai_csv(
+            teks,
+            periode=periode,
+            user=request.user,
+            hanya_kriteria_user=not user_profile.is_admin(),
+            hanya_periode_default=not user_profile.is_admin(),
+        )
+    except (UnicodeDecodeError, csv.Error) as e:
+        messages.error(request, f'File CSV tidak bisa dibaca: {e}')
+        return None
+    messages.success(request, f"{laporan['tersimpan']} nilai berhasil diimport.")
+    return laporan
+
+@role_required(['admin', 'staff'])
+def import_nilai(request):
+    """Upload CSV nilai produk - hanya untuk admin & staff"""
+    user_profile = request.profile
+    periode_aktif = ambil_periode_aktif()
+    laporan = None
+    
+    if request.method == 'POST':
+        berkas = request.FILES.get('berkas')
+        if not berkas:
+            messages.error(request, 'Pilih file CSV terlebih dahulu.')
+        else:
+            laporan = _impor_berkas(request, berkas, user_profile, periode_aktif)
+    
+    context = {
+        'user': request.user,
+        'user_profile': user_profile,
+        'periode_aktif': periode_aktif,
+        'semua_periode': Periode.objects.all().order_by('-tanggal_mulai'),
+        'laporan': laporan,
+    }
+    return render(request, 'spk/import_nilai.html', context)
+
 @role_required(['admin', 'staff'])
 def analytics_dashboard(request):
     """Halaman analytics - hanya untuk admin & staff"""
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
-        periode_aktif = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+        user_profile = request.profile
+        periode_aktif = ambil_periode_aktif()
         semua_periode = Periode.objects.all().order_by('-tanggal_mulai')
         
-        sales_analytics = get_sales_analytics()
+        sales_analytics = get_sales_analytics(
+            periode_count=_ambil_int(request, 'periode_count', 4, maksimum=60),
+            top_n=_ambil_int(request, 'top_n', 5, maksimum=50),
+        )
         improvements = get_improvement_analysis()
         kriteria_analysis = get_kriteria_analysis(periode_aktif)
         
@@ -260,29 +386,54 @@ def analytics_dashboard(request):
         return redirect('user_home')
 
 @role_required(['admin', 'staff'])
+@kondisional_ranking(semua=lambda request, report_type='ranking': report_type != 'ranking')
 def export_report(request, report_type='ranking'):
-    """Export laporan - hanya untuk admin & staff"""
+    """
+    Export laporan - hanya untuk admin & staff.
+    ?format=csv|ndjson dialirkan (streaming); 'ranking_semua' dan 'nilai' default CSV.
+    """
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
-        periode_aktif = Periode.objects.filter(is_active=True).order_by('-tanggal_mulai').first()
+        periode_aktif = ambil_periode_aktif()
+        nama_periode = periode_aktif.nama if periode_aktif else "all"
+        
+        format_default = 'json' if report_type in ('ranking', 'analytics') else 'csv'
+        format_ekspor = request.GET.get('format', format_default)
         
-        if report_type == 'ranking':
-            data = hitung_topsis(periode_aktif.id if periode_aktif else None)
-            filename = f'ranking_report_{periode_aktif.nama if periode_aktif else "all"}.json'
+        if format_ekspor in FORMAT_STREAM:
+            if report_type == 'ranking':
+                kolom, baris = KOLOM_RANKING, baris_ranking([periode_aktif] if periode_aktif else [])
+            elif report_type == 'ranking_semua':
+                kolom, baris = KOLOM_RANKING, baris_ranking(Periode.objects.order_by('tanggal_mulai'))
+                nama_periode = 'semua'
+            elif report_type == 'nilai':
+                kolom, baris = KOLOM_NILAI, baris_nilai()
+                nama_periode = 'semua'
+            else:
+                messages.error(request, 'Jenis report tidak valid.')
+                return redirect('analytics_dashboard')
+            return streaming_response(format_ekspor, kolom, baris, f'{report_type}_report_{nama_periode}')
         
-        elif report_type == 'analytics':
+        if report_type == 'ranking' and format_ekspor == 'json':
+            data = ambil_ranking(periode_aktif)
+            filename = f'ranking_report_{nama_periode}.json'
+        
+        elif report_type == 'analytics' and format_ekspor == 'json':
             data = {
                 'sales_analytics': get_sales_analytics(),
                 'improvements': get_improvement_analysis(),
                 'kriteria_analysis': get_kriteria_analysis(periode_aktif),
             }
-            filename = f'analytics_report_{periode_aktif.nama if periode_aktif else "all"}.json'
+            filename = f'analytics_report_{nama_periode}.json'
         
         else:
             messages.error(request, 'Jenis report tidak valid.')
             return redirect('analytics_dashboard')
         
-        response = JsonResponse(data, safe=False)
+        # TabelRanking langsung ditulis sebagai teks JSON, tanpa dict per baris
+        if isinstance(data, TabelRanking):
+            response = HttpResponse(data.ke_json(), content_type='application/json')
+        else:
+            response = JsonResponse(data, safe=False)
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         messages.success(request, f'Report {report_type} berhasil diexport!')
@@ -293,5 +444,49 @@ def export_report(request, report_type='ranking'):
         messages.error(request, 'Terjadi error saat export report.')
         return redirect('analytics_dashboard')
 
+@role_required(['admin', 'staff'])
+def api_bandingkan_periode(request):
+    """JSON perbandingan ranking dua periode: ?dari=<id>&ke=<id>"""
+    periode_awal = _periode_dari_get(request, 'dari')
+    periode_akhir = _periode_dari_get(request, 'ke')
+    limit = _ambil_int(request, 'limit', 5, maksimum=100)
+    return JsonResponse(bandingkan_periode(periode_awal, periode_akhir, limit=limit))
+
+@role_required(['admin', 'staff', 'viewer'])
+def api_ranking_metode(request):
+    """JSON ranking satu periode untuk beberapa metode: ?periode=<id>&metode=topsis,saw,wp,vikor"""
+    periode = _periode_dari_get(request, 'periode', wajib=False)
+    metode_list = [m for m in request.GET.get('metode', '').split(',') if m] or list(METODE)
+    try:
+        hasil = hitung_banyak_metode(periode, metode_list)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'periode': periode.nama if periode else None, 'hasil': hasil})
+
+@role_required(['admin', 'staff'])
+def api_riwayat_ranking(request):
+    """JSON lintasan rank semua periode di antara ?dari=<id>&sampai=<id> (inklusif)"""
+    periode_dari = _periode_dari_get(request, 'dari')
+    periode_sampai = _periode_dari_get(request, 'sampai')
+    awal, akhir = sorted([periode_dari.tanggal_mulai, periode_sampai.tanggal_mulai])
+    periode_list = Periode.objects.filter(tanggal_mulai__range=(awal, akhir))
+    produk_limit = _ambil_int(request, 'limit', 0, minimum=0) or None
+    return JsonResponse(get_rank_trajectories(periode_list, produk_limit=produk_limit))
+
+@role_required(['admin', 'staff'])
+def api_sensitivitas(request):
+    """JSON analisis sensitivitas bobot: ?periode=<id>&sampel=1000&sebaran=20&seed=&limit=20"""
+    periode = _periode_dari_get(request, 'periode', wajib=False)
+    seed = request.GET.get('seed')
+    hasil = get_sensitivitas_bobot(
+        periode,
+        n_sampel=_ambil_int(request, 'sampel', 1000, maksimum=20000),
+        sebaran=_ambil_int(request, 'sebaran', 20, minimum=0, maksimum=100) / 100,
+        seed=int(seed) if seed and seed.isdigit() else None,
+        top_rank=_ambil_int(request, 'top', 10, maksimum=50),
+        produk_limit=_ambil_int(request, 'limit', 20, maksimum=200),
+    )
+    return JsonResponse(hasil)
+
 def index(request):
     return redirect('login')
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""
+Initializer ProcessPoolExecutor (spawn). Modul ini tidak mengimport model,
+jadi bisa dijalankan di proses worker sebelum Django siap.
+"""
+import django
+from django.conf import settings
+
+
+def siapkan_django(databases):
+    """
+    Siapkan Django di worker dengan DATABASES milik proses utama, supaya
+    worker membaca DB yang sama walaupun setting-nya diubah saat runtime
+    (misalnya nama DB test).
+    """
+    settings.DATABASES = databases
+    django.setup()
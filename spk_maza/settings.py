@@ -42,13 +42,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'spk.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'spk.middleware.ProfilMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'spk.middleware.MemoRequestMiddleware',
 ]
 
 ROOT_URLCONF = 'spk_maza.urls'
@@ -130,6 +133,43 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 APPEND_SLASH = True
+
+# Instrumentasi per request (spk.middleware.ServerTimingMiddleware); header
+# Server-Timing hanya dikirim saat DEBUG atau ke admin kecuali diset True/False
+SPK_TIMING_HEADER = None
+SPK_TIMING_LOG = False
+SPK_TIMING_BATAS_MS = 1000
+SPK_TIMING_JUMLAH_QUERY_LAMBAT = 5
+
+# Ranking dihitung ulang di latar oleh `manage.py ranking_worker`; pembaca langsung
+# mendapat ranking terakhir yang selesai. Aktifkan hanya kalau worker dijalankan.
+SPK_RANKING_LATAR = False
+SPK_WORKER_INTERVAL = 2.0
+SPK_WORKER_JEDA = 5.0
+SPK_WORKER_MAKS_TUNDA = 60.0
+
+# Cache data referensi (kriteria, produk, periode aktif) per proses; versi di DB
+# dicek ulang paling sering tiap sekian detik (spk.cache.versi_referensi)
+SPK_REFERENSI_TTL = 2.0
+
+# Profil & role disimpan di session (spk.middleware.ProfilMiddleware); session
+# sendiri dibaca dari cache dulu, baru DB
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SPK_PROFIL_TTL = 300
+
+# snapshot matriks keputusan untuk analisis offline (manage.py snapshot_matrices)
+SPK_SNAPSHOT_DIR = MEDIA_ROOT / 'snapshot'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'spk': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 LOGIN_URL = '/spk/login/'
 LOGIN_REDIRECT_URL = '/spk/home/'
 LOGOUT_REDIRECT_URL = '/spk/login/'